@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'anonymous_thought_board.settings')
+# Read by settings before get_asgi_application() loads them
+os.environ['THOUGHTIFY_ASGI'] = '1'
 
 application = get_asgi_application()
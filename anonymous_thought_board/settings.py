@@ -29,6 +29,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Outermost, so its timings include every other middleware
+    'thoughtify.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -42,7 +44,8 @@ ROOT_URLCONF = 'anonymous_thought_board.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates that reports render time to RequestMetricsMiddleware
+        'BACKEND': 'thoughtify.template_backends.TimedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -58,14 +61,35 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'anonymous_thought_board.wsgi.application'
 
+# Set by asgi.py, so settings can tell which handler serves the process
+ASGI = os.environ.get('THOUGHTIFY_ASGI') == '1'
+
+# The feed, my thoughts and profile pages have async twins, on by default under ASGI.
+# Under WSGI each would run through async_to_sync, so the sync views serve there.
+# They are not faster under ASGI either, see "ASGI" in the README.
+ASYNC_VIEWS = os.environ.get('THOUGHTIFY_ASYNC_VIEWS', '1' if ASGI else '0') == '1'
+
 # Database
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        # Overridable so a benchmark can point real servers at a throwaway copy
+        'NAME': os.environ.get('THOUGHTIFY_DB', BASE_DIR / 'db.sqlite3'),
+        # Keep one connection per worker instead of reconnecting every request. Under
+        # ASGI each request's sync code runs on a thread of its own, so a kept
+        # connection would never be reused, only left open until that thread goes.
+        'CONN_MAX_AGE': 0 if ASGI else 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Seconds to wait for a lock before "database is locked"
+            'timeout': 5,
+        },
     }
 }
 
+# Overrides for thoughtify.db.DEFAULT_PRAGMAS, applied to every new SQLite connection
+SQLITE_PRAGMAS = {}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -101,19 +125,77 @@ LOGIN_REDIRECT_URL = 'feed'
 LOGOUT_REDIRECT_URL = 'landing_page'
 
 # Session settings
-SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+# cached_db reads sessions from the shared cache and only writes the database
+# when a session changes; signed_cookies keeps them out of the database entirely.
+# Pick one with THOUGHTIFY_SESSIONS.
+SESSION_ENGINES = {
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+    'db': 'django.contrib.sessions.backends.db',
+}
+SESSION_ENGINE = SESSION_ENGINES[os.environ.get('THOUGHTIFY_SESSIONS', 'cached_db')]
 SESSION_COOKIE_AGE = 1209600  # 2 weeks in seconds
+# Only save sessions whose data changed
+SESSION_SAVE_EVERY_REQUEST = False
+
+# Anonymous drafts not published by a signup within this long are purged
+DRAFT_THOUGHT_TTL = 86400  # 1 day in seconds
+
+# Seconds for a like's weight in the trending ranking to halve
+TRENDING_HALF_LIFE = 6 * 3600
 
 # Cache configuration for rate limiting
+# A SQLite file in WAL mode, shared by every worker process on the host
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
-    }
+        'BACKEND': 'thoughtify.cache_backends.SQLiteCache',
+        'LOCATION': os.environ.get('THOUGHTIFY_CACHE', BASE_DIR / 'cache.sqlite3'),
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 20000,
+            'CULL_FREQUENCY': 4,
+        },
+    },
+    # {% cache %} fragments, stored in the default cache and counted for /metrics
+    'template_fragments': {
+        'BACKEND': 'thoughtify.fragment_cache.FragmentCache',
+        'LOCATION': 'default',
+    },
 }
 
+# Runs the suite against a throwaway cache file instead of cache.sqlite3
+TEST_RUNNER = 'thoughtify.test_runner.ThoughtifyTestRunner'
+
+# Request instrumentation, see thoughtify.middleware.RequestMetricsMiddleware
+SERVER_TIMING = True
+# Queries a view may run before a warning is logged, by URL name
+QUERY_BUDGETS = {
+    'feed': 8,
+    'my_thoughts': 8,
+    'like_thought': 10,
+    'search': 8,
+    'trending': 8,
+    'mood_analytics': 6,
+    # Claims an anonymous code from the pool and publishes pending drafts
+    'signup': 30,
+}
+DEFAULT_QUERY_BUDGET = 20
+
+# Each worker writes its counters here every METRICS_FLUSH_INTERVAL seconds
+# and /metrics sums the files; files of exited workers are folded into one
+METRICS_DIR = BASE_DIR / 'metrics'
+METRICS_FLUSH_INTERVAL = 5
+# Bearer token for /metrics; when empty nobody may scrape it
+METRICS_TOKEN = os.environ.get('THOUGHTIFY_METRICS_TOKEN', '')
+
+# Live feed over Server-Sent Events (ASGI only), see thoughtify.live
+LIVE_FEED_QUEUE_SIZE = 20  # cards buffered per connection before the oldest is dropped
+LIVE_FEED_HEARTBEAT = 15  # seconds between keep-alive comments
+LIVE_FEED_MAX_SECONDS = 300  # streams end after this and the browser reconnects
+
 # Message settings
-MESSAGE_STORAGE = 'django.contrib.messages.storage.session.SessionStorage'
+# Flash messages ride in a cookie, so showing one never touches the session
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
 
 # Logging configuration
 LOGGING = {
@@ -1,8 +1,10 @@
 import os
-import nltk
 from pathlib import Path
 
 def setup():
+    # Imported here so nothing else pays for nltk just by importing this module
+    import nltk
+
     # Download required NLTK data
     print("Downloading NLTK data...")
     nltk.download('punkt')
@@ -1,7 +1,11 @@
+from datetime import timedelta
+
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import User
-from .models import Thought, EmotionTag, UserProfile, DraftThought
+from django.utils import timezone
+from .models import Thought, EmotionTag, UserProfile, DraftThought, MoodRollup
+from . import rollups, search
 
 class UserProfileInline(admin.StackedInline):
     model = UserProfile
@@ -26,9 +30,16 @@ admin.site.register(User, CustomUserAdmin)
 class ThoughtAdmin(admin.ModelAdmin):
     list_display = ('get_author', 'content_preview', 'emotion_tag', 'sentiment', 'is_daily_thought', 'is_public', 'created_at')
     list_filter = ('emotion_tag', 'sentiment', 'is_daily_thought', 'is_public', 'created_at')
-    search_fields = ('content', 'author__username', 'author__userprofile__anonymous_code')
+    # Content is matched through the FTS index in get_search_results
+    search_fields = ('author__username', 'author__userprofile__anonymous_code')
     date_hierarchy = 'created_at'
     readonly_fields = ('created_at', 'updated_at')
+
+    def get_search_results(self, request, queryset, search_term):
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if search_term:
+            results |= queryset.filter(search.content_filter(search_term))
+        return results, may_have_duplicates
     
     def content_preview(self, obj):
         return obj.content[:50] + '...' if len(obj.content) > 50 else obj.content
@@ -63,3 +74,44 @@ class DraftThoughtAdmin(admin.ModelAdmin):
     def content_preview(self, obj):
         return obj.content[:50] + '...' if len(obj.content) > 50 else obj.content
     content_preview.short_description = 'Content'
+
+@admin.register(MoodRollup)
+class MoodRollupAdmin(admin.ModelAdmin):
+    """Read-only dashboard over the daily mood rollups; rows come from triggers, not edits"""
+    change_list_template = 'admin/thoughtify/moodrollup/change_list.html'
+    list_display = ('day', 'get_emotion_tag', 'sentiment', 'thoughts')
+    list_filter = ('sentiment',)
+    date_hierarchy = 'day'
+    dashboard_days = 30
+
+    def get_emotion_tag(self, obj):
+        return rollups.tag_name(obj.emotion_tag_id)
+    get_emotion_tag.short_description = 'Emotion tag'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        end = timezone.now().date()
+        summary = rollups.summary(end - timedelta(days=self.dashboard_days - 1), end)
+        total = summary['total']
+
+        def shares(counts):
+            return [(label, count, round(100 * count / total) if total else 0)
+                    for label, count in sorted(counts.items(), key=lambda item: -item[1])]
+
+        extra_context = {
+            **(extra_context or {}),
+            'dashboard_days': self.dashboard_days,
+            'mood_total': total,
+            'mood_tags': shares(summary['emotion_tags']),
+            'mood_sentiments': shares(summary['sentiments']),
+            'mood_days': summary['days'][::-1],
+        }
+        return super().changelist_view(request, extra_context)
@@ -1,6 +1,34 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
+
+
+def ensure_search_index(sender, using, **kwargs):
+    from django.db import connections
+    from . import search
+    connection = connections[using]
+    # Table rebuilds during migrate drop the FTS triggers; put them back
+    if search.install(connection):
+        search.rebuild(connection)
+
+
+def ensure_mood_rollups(sender, using, **kwargs):
+    from django.db import connections
+    from . import rollups
+    connection = connections[using]
+    # Same as the search triggers: recreate, then recount what was missed
+    if rollups.install(connection):
+        rollups.rebuild(conn=connection)
+        rollups.rebuild_timelines(conn=connection)
 
 
 class ThoughtifyConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'thoughtify'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .db import configure_connection
+        connection_created.connect(configure_connection, dispatch_uid='thoughtify.configure_connection')
+        post_migrate.connect(ensure_search_index, sender=self)
+        post_migrate.connect(ensure_mood_rollups, sender=self)
@@ -0,0 +1,222 @@
+"""
+Cache backend stored in a local SQLite file in WAL mode.
+
+Every worker process on the host opens the same file, so they share hits,
+invalidations and counters without running a separate cache server. WAL lets
+readers proceed while one writer commits. Integers are stored as native SQLite
+integers so incr()/decr() add inside SQLite under the write lock instead of
+read-modify-write in Python; everything else is pickled.
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'thoughtify.cache_backends.SQLiteCache',
+            'LOCATION': BASE_DIR / 'cache.sqlite3',
+            'OPTIONS': {'MAX_ENTRIES': 10000, 'CULL_FREQUENCY': 3},
+        }
+    }
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# How many writes a process makes between checks of the entry count
+CULL_CHECK_INTERVAL = 100
+
+
+class SQLiteCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = str(location)
+        self._busy_timeout = int(params.get('OPTIONS', {}).get('BUSY_TIMEOUT', 5000))
+        self._local = threading.local()
+        self._writes = 0
+
+    # Connections -----------------------------------------------------------
+
+    def _connection(self):
+        # One connection per thread, reopened after a fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        conn = sqlite3.connect(self._path, timeout=self._busy_timeout / 1000, isolation_level=None,
+                               check_same_thread=False)
+        conn.execute(f'PRAGMA busy_timeout = {self._busy_timeout}')
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA synchronous = NORMAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS cache_entries ('
+            'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL) WITHOUT ROWID'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS cache_entries_expires ON cache_entries (expires)')
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def close(self, **kwargs):
+        # Connections are cheap to keep and expensive to reopen; keep them across requests
+        pass
+
+    # Encoding --------------------------------------------------------------
+
+    def _encode(self, value):
+        # bool is an int subclass but must round-trip as bool, so check the exact type
+        if type(value) is int and -2 ** 63 <= value < 2 ** 63:
+            return value
+        return sqlite3.Binary(pickle.dumps(value, self.pickle_protocol))
+
+    def _decode(self, value):
+        if isinstance(value, int):
+            return value
+        return pickle.loads(value)
+
+    def _expiry(self, timeout):
+        return self.get_backend_timeout(timeout)
+
+    # Reads -----------------------------------------------------------------
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._connection().execute(
+            'SELECT value FROM cache_entries WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (key, time.time()),
+        ).fetchone()
+        if row is None:
+            return default
+        return self._decode(row[0])
+
+    def get_many(self, keys, version=None):
+        key_map = {self.make_and_validate_key(key, version=version): key for key in keys}
+        if not key_map:
+            return {}
+        placeholders = ','.join('?' * len(key_map))
+        rows = self._connection().execute(
+            f'SELECT key, value FROM cache_entries WHERE key IN ({placeholders}) '
+            'AND (expires IS NULL OR expires > ?)',
+            (*key_map, time.time()),
+        ).fetchall()
+        return {key_map[key]: self._decode(value) for key, value in rows}
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._connection().execute(
+            'SELECT 1 FROM cache_entries WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (key, time.time()),
+        ).fetchone()
+        return row is not None
+
+    # Writes ----------------------------------------------------------------
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._connection().execute(
+            'INSERT OR REPLACE INTO cache_entries (key, value, expires) VALUES (?, ?, ?)',
+            (key, self._encode(value), self._expiry(timeout)),
+        )
+        self._maybe_cull()
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self._expiry(timeout)
+        rows = [
+            (self.make_and_validate_key(key, version=version), self._encode(value), expires)
+            for key, value in data.items()
+        ]
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany(
+                'INSERT OR REPLACE INTO cache_entries (key, value, expires) VALUES (?, ?, ?)', rows
+            )
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        self._maybe_cull(len(rows))
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        # Insert, or take over an expired entry; a live entry is left alone
+        cursor = self._connection().execute(
+            'INSERT INTO cache_entries (key, value, expires) VALUES (?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires = excluded.expires '
+            'WHERE cache_entries.expires IS NOT NULL AND cache_entries.expires <= ?',
+            (key, self._encode(value), self._expiry(timeout), time.time()),
+        )
+        added = cursor.rowcount == 1
+        if added:
+            self._maybe_cull()
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._connection().execute(
+            'UPDATE cache_entries SET expires = ? WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self._expiry(timeout), key, time.time()),
+        )
+        return cursor.rowcount == 1
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        conn = self._connection()
+        # IMMEDIATE takes the write lock up front, so the update and read-back are atomic
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            cursor = conn.execute(
+                "UPDATE cache_entries SET value = value + ? WHERE key = ? "
+                "AND typeof(value) = 'integer' AND (expires IS NULL OR expires > ?)",
+                (delta, key, time.time()),
+            )
+            if cursor.rowcount != 1:
+                raise ValueError("Key '%s' not found" % key)
+            value = conn.execute('SELECT value FROM cache_entries WHERE key = ?', (key,)).fetchone()[0]
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return value
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._connection().execute('DELETE FROM cache_entries WHERE key = ?', (key,))
+        return cursor.rowcount == 1
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_and_validate_key(key, version=version) for key in keys]
+        if keys:
+            placeholders = ','.join('?' * len(keys))
+            self._connection().execute(f'DELETE FROM cache_entries WHERE key IN ({placeholders})', keys)
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache_entries')
+
+    # Eviction --------------------------------------------------------------
+
+    def _maybe_cull(self, writes=1):
+        self._writes += writes
+        if self._writes < CULL_CHECK_INTERVAL:
+            return
+        self._writes = 0
+        self.cull()
+
+    def cull(self):
+        """Drop expired entries, then the soonest-expiring ones while over MAX_ENTRIES"""
+        conn = self._connection()
+        conn.execute('DELETE FROM cache_entries WHERE expires IS NOT NULL AND expires <= ?', (time.time(),))
+        count = conn.execute('SELECT COUNT(*) FROM cache_entries').fetchone()[0]
+        if count <= self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            conn.execute('DELETE FROM cache_entries')
+            return
+        # Entries without a timeout sort last, so they are evicted last
+        conn.execute(
+            'DELETE FROM cache_entries WHERE key IN ('
+            'SELECT key FROM cache_entries ORDER BY expires IS NULL, expires LIMIT ?)',
+            (count // self._cull_frequency,),
+        )
@@ -2,6 +2,45 @@ from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib.auth.models import User
 from .models import Thought, UserProfile, EMOJI_CHOICES
+from .tag_cache import get_emotion_tag, get_emotion_tag_choices
+
+class CachedTagChoices:
+    """Reads the tag cache when iterated, so defining a form at import time runs no query"""
+
+    def __init__(self, field):
+        self.field = field
+
+    def __iter__(self):
+        return iter(get_emotion_tag_choices(self.field.empty_label))
+
+    def __len__(self):
+        return len(get_emotion_tag_choices(self.field.empty_label))
+
+    def __bool__(self):
+        return True
+
+
+class EmotionTagChoiceField(forms.ModelChoiceField):
+    """Renders and validates emotion tags from the process-wide tag cache, without queries"""
+
+    def _get_choices(self):
+        if hasattr(self, '_choices'):
+            return self._choices
+        return CachedTagChoices(self)
+
+    choices = property(_get_choices, forms.ChoiceField._set_choices)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            tag = get_emotion_tag(int(value))
+        except (TypeError, ValueError):
+            tag = None
+        if tag is None:
+            raise forms.ValidationError(self.error_messages['invalid_choice'], code='invalid_choice')
+        return tag
+
 
 class EmailAuthenticationForm(AuthenticationForm):
     username = forms.EmailField(
@@ -60,6 +99,7 @@ class ThoughtForm(forms.ModelForm):
     class Meta:
         model = Thought
         fields = ('content', 'emotion_tag', 'is_public')
+        field_classes = {'emotion_tag': EmotionTagChoiceField}
         widgets = {
             'content': forms.Textarea(attrs={
                 'class': 'shadow-sm focus:ring-indigo-500 focus:border-indigo-500 block w-full sm:text-sm border-gray-300 rounded-md',
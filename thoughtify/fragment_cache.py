@@ -0,0 +1,58 @@
+"""
+Cache alias for the {% cache %} tag that counts hits and misses per fragment.
+
+Django's cache tag stores fragments in the 'template_fragments' cache when
+one is configured. FragmentCache is that alias: it passes every call through
+to another configured cache (LOCATION names it) and records each lookup for
+/metrics, so the storage backend itself knows nothing about metrics.
+
+    CACHES = {
+        'default': {...},
+        'template_fragments': {
+            'BACKEND': 'thoughtify.fragment_cache.FragmentCache',
+            'LOCATION': 'default',
+        },
+    }
+"""
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from . import metrics
+
+_missing = object()
+
+
+class FragmentCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._alias = location
+
+    @property
+    def _cache(self):
+        # Looked up per call: Django keeps a cache instance per thread
+        return caches[self._alias]
+
+    def get(self, key, default=None, version=None):
+        value = self._cache.get(key, _missing, version)
+        # template.cache.<fragment name>.<hash>, from make_template_fragment_key
+        metrics.inc('thoughtify_fragment_cache_requests_total',
+                    fragment=key.split('.')[2], result='miss' if value is _missing else 'hit')
+        return default if value is _missing else value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._cache.set(key, value, timeout, version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._cache.add(key, value, timeout, version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._cache.touch(key, timeout, version)
+
+    def delete(self, key, version=None):
+        return self._cache.delete(key, version)
+
+    def has_key(self, key, version=None):
+        return self._cache.has_key(key, version)
+
+    def clear(self):
+        self._cache.clear()
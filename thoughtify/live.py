@@ -0,0 +1,111 @@
+"""
+In-process fan-out of newly published thoughts to live feed connections.
+
+Each Server-Sent Events connection subscribes a bounded asyncio queue. Thoughts
+are rendered once, when the transaction that publishes them commits, and the
+same HTML is handed to every queue. A client that stops reading loses its
+oldest undelivered cards rather than holding memory for them.
+
+Only thoughts published by this process are seen, so the live feed relies on
+the site being served by the ASGI application, where views and streams share
+one process per worker.
+"""
+import asyncio
+import threading
+
+from django.conf import settings
+from django.template.loader import render_to_string
+
+from . import request_threads
+from .models import Thought
+
+
+class Broadcaster:
+    def __init__(self, queue_size=None):
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._loop = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    def subscribe(self):
+        """Register a new queue on the running event loop; pair with unsubscribe()"""
+        size = self.queue_size or getattr(settings, 'LIVE_FEED_QUEUE_SIZE', 20)
+        queue = asyncio.Queue(maxsize=size)
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        with self._lock:
+            self._subscribers.discard(queue)
+
+    def publish(self, message):
+        """Queue ``message`` for every subscriber; safe to call from any thread"""
+        with self._lock:
+            loop = self._loop
+            if not self._subscribers or loop is None or loop.is_closed():
+                return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._fan_out(message)
+        else:
+            # Sync views run in worker threads; queues may only be touched on their loop
+            loop.call_soon_threadsafe(self._fan_out, message)
+
+    def _fan_out(self, message):
+        for queue in list(self._subscribers):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+
+thoughts = Broadcaster()
+
+
+def publish_thought(thought_id):
+    """Render a public thought's feed card once and send it to every live connection"""
+    if not thoughts:
+        return
+    thought = (Thought.objects.select_related('author__userprofile', 'emotion_tag')
+               .filter(pk=thought_id, is_public=True).first())
+    if thought is None:
+        return
+    html = render_to_string('thoughtify/partials/feed_card.html', {'thought': thought, 'liked': False})
+    thoughts.publish(html.strip())
+
+
+def format_event(event, data):
+    # Every line of a multi-line payload needs its own data: prefix
+    lines = ''.join(f'data: {line}\n' for line in data.splitlines())
+    return f'event: {event}\n{lines}\n'
+
+
+async def stream(broadcaster=thoughts):
+    """SSE body for one connection; ends after LIVE_FEED_MAX_SECONDS and the browser reconnects"""
+    heartbeat = getattr(settings, 'LIVE_FEED_HEARTBEAT', 15)
+    loop = asyncio.get_running_loop()
+    # Bounded so a connection whose client vanished without us noticing is released
+    deadline = loop.time() + getattr(settings, 'LIVE_FEED_MAX_SECONDS', 300)
+    # The body is first read after every middleware has run, so nothing needs
+    # the request's sync thread again until the response is closed
+    request_threads.release()
+    queue = broadcaster.subscribe()
+    try:
+        yield 'retry: 5000\n\n'
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                html = await asyncio.wait_for(queue.get(), timeout=min(heartbeat, remaining))
+            except asyncio.TimeoutError:
+                # A comment line keeps proxies from closing an idle stream
+                yield ': keep-alive\n\n'
+                continue
+            yield format_event('thought', html)
+    finally:
+        broadcaster.unsubscribe(queue)
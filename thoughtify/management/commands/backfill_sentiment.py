@@ -0,0 +1,38 @@
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+from django.core.management.base import BaseCommand
+from thoughtify import sentiment
+from thoughtify.models import Thought
+
+class Command(BaseCommand):
+    help = 'Scores the sentiment of existing thoughts using a pool of processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Thoughts read and written per database round trip')
+        parser.add_argument('--rescore', action='store_true',
+                            help='Score every thought, not only the unscored ones')
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        batch_size = options['batch_size']
+        # Each worker process loads the model once, in the initializer
+        chunk_size = max(1, batch_size // (workers * 4))
+        scored = 0
+        last_id = 0
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=sentiment.load) as pool:
+            while True:
+                rows = Thought.pending_sentiment(batch_size, after_id=last_id, rescore=options['rescore'])
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                texts = [content for _, content, _ in rows]
+                chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+                labels = [label for chunk in pool.map(sentiment.score_texts, chunks) for label in chunk]
+                scored += Thought.save_sentiments(rows, labels)
+                self.stdout.write(f'Scored {scored} thoughts so far...')
+
+        self.stdout.write(self.style.SUCCESS(f'Successfully scored {scored} thoughts!'))
@@ -0,0 +1,184 @@
+import asyncio
+import os
+import random
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import CommandError
+from django.db import connection
+
+from . import bench_db_concurrency
+
+APPLICATION = 'anonymous_thought_board.{}:application'
+
+# The read-heavy pages the async views serve, weighted like real traffic
+PAGES = ('/feed/',) * 6 + ('/my-thoughts/',) * 3 + ('/profile/',)
+
+
+def servers(workers, threads):
+    """gunicorn command lines for the two deployments, both with ``workers`` processes"""
+    return {
+        'wsgi': ['-k', 'gthread', '--threads', str(threads), APPLICATION.format('wsgi')],
+        'asgi': ['-k', 'uvicorn.workers.UvicornWorker', APPLICATION.format('asgi')],
+    }
+
+
+async def fetch(reader, writer, path, cookie):
+    """One keep-alive GET; returns the status code"""
+    writer.write(
+        f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nCookie: {cookie}\r\n\r\n'.encode()
+    )
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    headers = dict(line.split(': ', 1) for line in lines[1:] if ': ' in line)
+    headers = {name.lower(): value for name, value in headers.items()}
+    if 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    else:
+        # Chunked: read chunks until the empty one
+        while size := int((await reader.readline()).strip(), 16):
+            await reader.readexactly(size + 2)
+        await reader.readline()
+    return int(lines[0].split()[1])
+
+
+async def client(port, cookies, deadline, warmup_until, seed, results):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        while (start := time.perf_counter()) < deadline:
+            status = await fetch(reader, writer, rng.choice(PAGES), rng.choice(cookies))
+            if start < warmup_until:
+                continue
+            if status == 200:
+                results['latencies'].append(time.perf_counter() - start)
+            else:
+                results['errors'] += 1
+    except (ConnectionError, asyncio.IncompleteReadError):
+        results['errors'] += 1
+    finally:
+        writer.close()
+
+
+async def drive(port, cookies, concurrency, seconds, warmup):
+    results = {'latencies': [], 'errors': 0}
+    now = time.perf_counter()
+    await asyncio.gather(*(
+        client(port, cookies, now + warmup + seconds, now + warmup, n, results)
+        for n in range(concurrency)
+    ))
+    return results
+
+
+class Command(bench_db_concurrency.Command):
+    help = 'Compares requests/s and latency of the read views under gunicorn WSGI and ASGI workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2,
+                            help='Server processes for each deployment')
+        parser.add_argument('--threads', type=int, default=8,
+                            help='Threads per WSGI worker')
+        parser.add_argument('--concurrency', type=int, default=64,
+                            help='Simultaneous keep-alive clients')
+        parser.add_argument('--seconds', type=float, default=10)
+        parser.add_argument('--warmup', type=float, default=2)
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--thoughts', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('This benchmark only applies to SQLite')
+        workdir = tempfile.mkdtemp(prefix='bench-asgi-')
+        original_name = connection.settings_dict['NAME']
+        try:
+            database = self.build_dataset(workdir, options)
+            cookies = self.login_sessions(database, options)
+            results = {}
+            for name, arguments in servers(options['workers'], options['threads']).items():
+                results[name] = self.run_server(name, arguments, database, workdir, cookies, options)
+        finally:
+            connection.close()
+            connection.settings_dict['NAME'] = original_name
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        if results['wsgi']['throughput']:
+            gain = results['asgi']['throughput'] / results['wsgi']['throughput']
+            self.stdout.write(self.style.SUCCESS(f'ASGI: {gain:.2f}x the WSGI throughput'))
+
+    def login_sessions(self, database, options):
+        """Session cookies for a sample of users, written straight to the dataset"""
+        self.use_database(database)
+        users = User.objects.filter(username__startswith=f'load{options["seed"]}-')[:50]
+        cookies = []
+        for user in users:
+            # The db store, so nothing lands in this machine's shared cache file;
+            # cached_db sessions on the servers fall back to the table on a miss
+            session = SessionStore()
+            session[SESSION_KEY] = str(user.pk)
+            session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+            session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+            session.save()
+            cookies.append(f'{settings.SESSION_COOKIE_NAME}={session.session_key}')
+        connection.close()
+        if not cookies:
+            raise CommandError('The dataset has no users to log in as')
+        return cookies
+
+    def run_server(self, name, arguments, database, workdir, cookies, options):
+        port = free_port()
+        env = dict(
+            os.environ,
+            THOUGHTIFY_DB=database,
+            THOUGHTIFY_CACHE=os.path.join(workdir, f'{name}-cache.sqlite3'),
+        )
+        command = [
+            sys.executable, '-m', 'gunicorn', '--workers', str(options['workers']),
+            '--bind', f'127.0.0.1:{port}', '--log-level', 'warning', *arguments,
+        ]
+        server = subprocess.Popen(command, env=env, cwd=settings.BASE_DIR)
+        try:
+            wait_for_port(port, server)
+            outcome = asyncio.run(drive(
+                port, cookies, options['concurrency'], options['seconds'], options['warmup']
+            ))
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=30)
+
+        latencies = outcome['latencies']
+        throughput = len(latencies) / options['seconds']
+        self.stdout.write(
+            f'{name:<5} {throughput:>8.0f} req/s  '
+            f'p50 {self.ms(latencies, 50)} p99 {self.ms(latencies, 99)}  '
+            f'errors {outcome["errors"]}'
+        )
+        return {'throughput': throughput}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise CommandError(f'{" ".join(process.args)} exited with {process.returncode}')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f'Nothing listening on port {port} after {timeout}s')
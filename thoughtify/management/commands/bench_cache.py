@@ -0,0 +1,93 @@
+from multiprocessing import get_context
+import os
+import shutil
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'sqlite': 'thoughtify.cache_backends.SQLiteCache',
+}
+
+# Backends whose entries are visible to every process on the host
+SHARED = {'file', 'sqlite'}
+
+
+def build(name, workdir):
+    location = {
+        'locmem': 'bench',
+        'file': os.path.join(workdir, 'file-cache'),
+        'sqlite': os.path.join(workdir, 'cache.sqlite3'),
+    }[name]
+    return import_string(BACKENDS[name])(location, {'OPTIONS': {'MAX_ENTRIES': 100000}})
+
+
+def workload(args):
+    """Run the operation mix against one backend; returns {operation: seconds}"""
+    name, workdir, iterations, worker = args
+    cache = build(name, workdir)
+    value = {'html': 'x' * 2048}
+    timings = {}
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        cache.set(f'key:{worker}:{i}', value, 300)
+    timings['set'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        cache.get(f'key:{worker}:{i}')
+    timings['get hit'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        cache.get(f'missing:{worker}:{i}')
+    timings['get miss'] = time.perf_counter() - start
+
+    cache.add('counter', 0, None)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        cache.incr('counter')
+    timings['incr'] = time.perf_counter() - start
+    return timings
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks the SQLite cache backend against locmem and the file cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=2000)
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Concurrent processes sharing one cache location')
+        parser.add_argument('--backends', nargs='+', choices=sorted(BACKENDS), default=list(BACKENDS))
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        workers = options['workers']
+        self.stdout.write(f'{iterations} ops per operation x {workers} worker(s)')
+        self.stdout.write(f'{"backend":<8} {"operation":<9} {"ops/s":>10}')
+
+        for name in options['backends']:
+            workdir = tempfile.mkdtemp(prefix='bench-cache-')
+            try:
+                jobs = [(name, workdir, iterations, worker) for worker in range(workers)]
+                if workers == 1:
+                    results = [workload(jobs[0])]
+                else:
+                    with get_context('fork').Pool(workers) as pool:
+                        results = pool.map(workload, jobs)
+                for operation in results[0]:
+                    # Workers run side by side, so throughput is bounded by the slowest one
+                    elapsed = max(result[operation] for result in results)
+                    rate = iterations * workers / elapsed if elapsed else float('inf')
+                    self.stdout.write(f'{name:<8} {operation:<9} {rate:>10.0f}')
+                if workers > 1 and name not in SHARED:
+                    self.stdout.write(self.style.WARNING(
+                        f'{name}: each process has its own copy; hits and counters are not shared'
+                    ))
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
@@ -0,0 +1,164 @@
+from multiprocessing import get_context
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from thoughtify.db import sqlite_pragmas
+from thoughtify.models import Like, Thought
+from thoughtify.pagination import KeysetPaginator
+from thoughtify.views import feed_queryset
+
+# Django's stock SQLite setup: rollback journal, full fsync, a new connection per request.
+# Overrides merge into the tuned defaults, so each of those is reset to SQLite's own value.
+BASELINE = {
+    'pragmas': {
+        'auto_vacuum': 'NONE',
+        'journal_mode': 'DELETE',
+        'synchronous': 'FULL',
+        'busy_timeout': 5000,  # Python's sqlite3 waits 5 seconds by default
+        'cache_size': -2000,
+        'mmap_size': 0,
+        'temp_store': 'DEFAULT',
+        'foreign_keys': 'ON',  # Django turns these on itself
+    },
+    'persistent': False,
+}
+
+
+def profiles():
+    return {
+        'default': BASELINE,
+        'tuned': {'pragmas': sqlite_pragmas(), 'persistent': True},
+    }
+
+
+def feed_read(user):
+    page = KeysetPaginator(feed_queryset({}), 20).get_page()
+    Like.liked_thought_ids(user, page)
+    # Touch the related rows the feed template renders
+    return [(thought.author.userprofile.anonymous_code, thought.emotion_tag.name) for thought in page]
+
+
+def worker(args):
+    """Mix feed reads and like toggles until the deadline; returns per-operation latencies"""
+    profile, user_ids, thought_ids, seconds, write_ratio, seed = args
+    settings.SQLITE_PRAGMAS = profile['pragmas']
+    rng = random.Random(seed)
+    users = {user.id: user for user in User.objects.filter(id__in=user_ids)}
+    latencies = {'read': [], 'write': []}
+    errors = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        user = users[rng.choice(user_ids)]
+        kind = 'write' if rng.random() < write_ratio else 'read'
+        start = time.perf_counter()
+        try:
+            if kind == 'write':
+                Like.toggle(user, rng.choice(thought_ids))
+            else:
+                feed_read(user)
+        except OperationalError:
+            # "database is locked" once the busy timeout runs out
+            errors += 1
+            continue
+        finally:
+            if not profile['persistent']:
+                connection.close()
+        latencies[kind].append(time.perf_counter() - start)
+    connection.close()
+    return latencies, errors
+
+
+class Command(BaseCommand):
+    help = 'Compares feed read and like write throughput under the default and tuned SQLite profiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument('--write-ratio', type=float, default=0.2,
+                            help='Share of operations that toggle a like')
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--thoughts', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('This benchmark only applies to SQLite')
+        workdir = tempfile.mkdtemp(prefix='bench-db-')
+        original_name = connection.settings_dict['NAME']
+        try:
+            template = self.build_dataset(workdir, options)
+            results = {}
+            for name, profile in profiles().items():
+                path = os.path.join(workdir, f'{name}.sqlite3')
+                shutil.copy(template, path)
+                results[name] = self.run_profile(name, path, profile, options)
+        finally:
+            connection.close()
+            connection.settings_dict['NAME'] = original_name
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        if results['default']['throughput']:
+            gain = results['tuned']['throughput'] / results['default']['throughput']
+            self.stdout.write(self.style.SUCCESS(f'Tuned profile: {gain:.1f}x the default throughput'))
+
+    def use_database(self, path):
+        connection.close()
+        connection.settings_dict['NAME'] = path
+
+    def build_dataset(self, workdir, options):
+        path = os.path.join(workdir, 'template.sqlite3')
+        self.use_database(path)
+        self.stdout.write(f'Building a dataset of {options["thoughts"]} thoughts in {workdir}...')
+        call_command('migrate', verbosity=0)
+        with open(os.devnull, 'w') as quiet:
+            call_command(
+                'generate_load_data', users=options['users'], thoughts=options['thoughts'],
+                likes=options['thoughts'] * 2, seed=options['seed'], stdout=quiet,
+            )
+        connection.close()
+        # Leave a self-contained rollback-journal file so every profile starts from the same state
+        with sqlite3.connect(path) as raw:
+            raw.execute('PRAGMA journal_mode = DELETE')
+        return path
+
+    def run_profile(self, name, path, profile, options):
+        self.use_database(path)
+        user_ids = list(User.objects.filter(username__startswith=f'load{options["seed"]}-')
+                        .values_list('id', flat=True))
+        thought_ids = list(Thought.objects.filter(is_public=True).values_list('id', flat=True))
+        connection.close()
+
+        workers = options['workers']
+        jobs = [
+            (profile, user_ids, thought_ids, options['seconds'], options['write_ratio'], options['seed'] + n)
+            for n in range(workers)
+        ]
+        with get_context('fork').Pool(workers) as pool:
+            outcomes = pool.map(worker, jobs)
+
+        reads = [latency for latencies, _ in outcomes for latency in latencies['read']]
+        writes = [latency for latencies, _ in outcomes for latency in latencies['write']]
+        errors = sum(errors for _, errors in outcomes)
+        throughput = (len(reads) + len(writes)) / options['seconds']
+        self.stdout.write(
+            f'{name:<8} {throughput:>8.0f} ops/s  '
+            f'read p50 {self.ms(reads, 50)} p95 {self.ms(reads, 95)}  '
+            f'write p50 {self.ms(writes, 50)} p95 {self.ms(writes, 95)}  '
+            f'locked {errors}'
+        )
+        return {'throughput': throughput, 'errors': errors}
+
+    def ms(self, samples, percentile):
+        if len(samples) < 2:
+            return '-'
+        return f'{statistics.quantiles(samples, n=100)[percentile - 1] * 1000:.1f}ms'
@@ -0,0 +1,65 @@
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from thoughtify.services import HEAVY_MODULES
+
+# Imports the WSGI app and its views in a fresh interpreter and reports what it pulled in
+WSGI_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import anonymous_thought_board.wsgi
+from django.urls import get_resolver
+get_resolver().url_patterns  # import every view module, as the first request would
+elapsed = time.perf_counter() - start
+print(json.dumps({'seconds': elapsed, 'heavy': [m for m in %r if m in sys.modules]}))
+"""
+
+class Command(BaseCommand):
+    help = 'Measures manage.py check and WSGI import time to catch startup regressions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--max-seconds', type=float, default=None,
+                            help='Fail if the median WSGI import takes longer than this')
+
+    def run(self, args):
+        start = time.perf_counter()
+        result = subprocess.run(args, cwd=settings.BASE_DIR, capture_output=True, text=True)
+        elapsed = time.perf_counter() - start
+        if result.returncode != 0:
+            raise CommandError(result.stderr.strip() or result.stdout.strip())
+        return elapsed, result.stdout
+
+    def report(self, label, samples):
+        self.stdout.write(
+            f'{label}: median {statistics.median(samples) * 1000:.0f} ms, '
+            f'min {min(samples) * 1000:.0f} ms, max {max(samples) * 1000:.0f} ms'
+        )
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        check_samples = [
+            self.run([sys.executable, 'manage.py', 'check'])[0] for _ in range(repeat)
+        ]
+        self.report('manage.py check', check_samples)
+
+        wsgi_samples = []
+        heavy = set()
+        for _ in range(repeat):
+            _, output = self.run([sys.executable, '-c', WSGI_PROBE % (HEAVY_MODULES,)])
+            probe = json.loads(output.strip().splitlines()[-1])
+            wsgi_samples.append(probe['seconds'])
+            heavy.update(probe['heavy'])
+        self.report('WSGI import', wsgi_samples)
+
+        if heavy:
+            raise CommandError(f'WSGI startup imported heavy modules: {", ".join(sorted(heavy))}')
+        limit = options['max_seconds']
+        if limit is not None and statistics.median(wsgi_samples) > limit:
+            raise CommandError(f'Median WSGI import exceeded {limit:.2f}s')
+        self.stdout.write(self.style.SUCCESS('No heavy NLP modules loaded at startup'))
@@ -1,49 +1,74 @@
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
-from thoughtify.models import UserProfile
+from django.db import transaction
+from thoughtify.models import AnonymousCode, UserProfile, CODE_WIDTHS
 import random
-import string
 
 class Command(BaseCommand):
     help = 'Creates UserProfile for users that don\'t have one'
 
-    def generate_anonymous_code(self):
-        """Generate a random 8-character anonymous code."""
-        return ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Number of profiles to insert per bulk_create')
+        parser.add_argument('--seed', type=int, default=None,
+                            help='Seed for the code shuffle, for reproducible runs. Leave unset '
+                                 'in production: a known seed makes the codes guessable')
 
-    def handle(self, *args, **kwargs):
-        users_without_profile = []
-        profiles_created = 0
+    def free_codes(self, rng, prefix, taken):
+        """Yield unused codes for a prefix in the same formats the signup allocator uses."""
+        for width in CODE_WIDTHS:
+            codes = [f"{prefix}{n:0{width}d}" for n in range(1, 10 ** width)]
+            rng.shuffle(codes)
+            for code in codes:
+                if code not in taken:
+                    yield code
 
-        # Get all users
-        for user in User.objects.all():
-            try:
-                # Try to access the user's profile
-                user.userprofile
-            except User.userprofile.RelatedObjectDoesNotExist:
-                users_without_profile.append(user)
+    def next_code(self, rng, username, generators, taken):
+        prefix = AnonymousCode.prefix_for(username)
+        if prefix not in generators:
+            generators[prefix] = self.free_codes(rng, prefix, taken)
+        code = next(generators[prefix], None)
+        if code is None:
+            raise RuntimeError(f"No anonymous codes left for prefix {prefix!r}")
+        taken.add(code)
+        return code
 
-        # Create profiles for users that don't have one
-        for user in users_without_profile:
-            # Generate a unique anonymous code
-            while True:
-                anonymous_code = self.generate_anonymous_code()
-                if not UserProfile.objects.filter(anonymous_code=anonymous_code).exists():
-                    break
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        rng = random.Random(options['seed'])
+        # Every code already in use, loaded once so uniqueness is checked in memory
+        taken = set(UserProfile.objects.values_list('anonymous_code', flat=True))
+        taken.update(AnonymousCode.objects.filter(claimed=True).values_list('code', flat=True))
+        generators = {}
+        profiles_created = 0
+        last_id = 0
 
-            UserProfile.objects.create(
-                user=user,
-                anonymous_code=anonymous_code,
-                bio=f"Sample bio for {user.username}"
-            )
-            profiles_created += 1
-            self.stdout.write(
-                self.style.SUCCESS(f'Created profile for user {user.username} with code {anonymous_code}')
+        while True:
+            # Anti-join: users with no matching profile row, walked in id order
+            users = list(
+                User.objects.filter(userprofile__isnull=True, id__gt=last_id)
+                .order_by('id')
+                .values_list('id', 'username')[:batch_size]
             )
+            if not users:
+                break
+            last_id = users[-1][0]
+            profiles = [
+                UserProfile(user_id=user_id, anonymous_code=self.next_code(rng, username, generators, taken))
+                for user_id, username in users
+            ]
+            with transaction.atomic():
+                UserProfile.objects.bulk_create(profiles)
+                # Keep the signup pool from handing these codes out again
+                AnonymousCode.objects.filter(
+                    code__in=[profile.anonymous_code for profile in profiles]
+                ).update(claimed=True)
+            profiles_created += len(profiles)
+            self.stdout.write(f'Created {profiles_created} profiles so far...')
 
         if profiles_created == 0:
             self.stdout.write(self.style.SUCCESS('All users already have profiles!'))
         else:
             self.stdout.write(
                 self.style.SUCCESS(f'Successfully created {profiles_created} user profiles!')
-            ) 
\ No newline at end of file
+            )
@@ -0,0 +1,138 @@
+import os
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+LOCK_KEY = 'db_maintenance:running'
+
+# PRAGMA auto_vacuum values
+AUTO_VACUUM_MODES = {0: 'none', 1: 'full', 2: 'incremental'}
+
+
+class Command(BaseCommand):
+    help = 'Checks, analyzes, vacuums and checkpoints the SQLite database; safe to run from cron'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full-check', action='store_true',
+                            help='Run integrity_check (reads every index) instead of quick_check')
+        parser.add_argument('--analyze', action='store_true',
+                            help='Run a full ANALYZE instead of PRAGMA optimize')
+        parser.add_argument('--vacuum-pages', type=int, default=500,
+                            help='Free pages to release per incremental vacuum step')
+        parser.add_argument('--enable-incremental-vacuum', action='store_true',
+                            help='Switch the file to auto_vacuum=INCREMENTAL with one full VACUUM. '
+                                 'This locks the database while it runs; do it in a quiet window')
+        parser.add_argument('--lock-timeout', type=int, default=3600,
+                            help='Seconds before a crashed run stops blocking the next one')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('db_maintenance only supports SQLite')
+        # Two cron runs overlapping would just fight over the write lock
+        if not cache.add(LOCK_KEY, os.getpid(), options['lock_timeout']):
+            self.stdout.write(self.style.WARNING('Another db_maintenance run is in progress, skipping'))
+            return
+        try:
+            self.run(options)
+        finally:
+            cache.delete(LOCK_KEY)
+
+    def run(self, options):
+        started = time.perf_counter()
+        before = self.file_sizes()
+        self.stdout.write(f'Before: {self.describe(before)}')
+
+        self.step('Integrity check', self.check_integrity, options['full_check'])
+        if options['enable_incremental_vacuum']:
+            self.step('Full VACUUM', self.enable_incremental_vacuum)
+        self.step('Vacuum', self.incremental_vacuum, options['vacuum_pages'])
+        self.step('Statistics', self.analyze, options['analyze'])
+        self.step('WAL checkpoint', self.checkpoint)
+
+        after = self.file_sizes()
+        self.stdout.write(f'After: {self.describe(after)}')
+        saved = sum(before.values()) - sum(after.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Maintenance finished in {time.perf_counter() - started:.2f}s, '
+            f'{self.mb(saved)} reclaimed'
+        ))
+
+    def step(self, label, func, *args):
+        start = time.perf_counter()
+        summary = func(*args)
+        self.stdout.write(f'{label}: {summary} ({time.perf_counter() - start:.2f}s)')
+
+    def pragma(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
+            return cursor.fetchall()
+
+    def check_integrity(self, full):
+        pragma = 'integrity_check' if full else 'quick_check'
+        problems = [row[0] for row in self.pragma(f'PRAGMA {pragma}') if row[0] != 'ok']
+        if problems:
+            for problem in problems[:20]:
+                self.stderr.write(problem)
+            # A non-zero exit makes cron report it
+            raise CommandError(f'{pragma} found {len(problems)} problem(s)')
+        return f'{pragma} ok'
+
+    def enable_incremental_vacuum(self):
+        self.pragma('PRAGMA auto_vacuum = INCREMENTAL')
+        self.pragma('VACUUM')
+        return 'auto_vacuum is now incremental'
+
+    def incremental_vacuum(self, pages_per_step):
+        mode = AUTO_VACUUM_MODES.get(self.pragma('PRAGMA auto_vacuum')[0][0])
+        free = self.pragma('PRAGMA freelist_count')[0][0]
+        if mode != 'incremental':
+            return (f'auto_vacuum is {mode}, {free} free pages left in place '
+                    '(run once with --enable-incremental-vacuum)')
+        released = 0
+        # Each step is its own short write transaction, so requests can
+        # take the lock between steps instead of waiting for the whole vacuum
+        while free > 0:
+            self.pragma(f'PRAGMA incremental_vacuum({pages_per_step})')
+            remaining = self.pragma('PRAGMA freelist_count')[0][0]
+            if remaining >= free:
+                break
+            released += free - remaining
+            free = remaining
+        return f'released {released} free pages'
+
+    def analyze(self, full):
+        if full:
+            self.pragma('ANALYZE')
+            return 'ANALYZE complete'
+        # Only re-analyzes tables whose statistics are missing or stale;
+        # the limit keeps a run on a large table bounded
+        self.pragma('PRAGMA analysis_limit = 1000')
+        self.pragma('PRAGMA optimize')
+        return 'PRAGMA optimize complete'
+
+    def checkpoint(self):
+        if self.pragma('PRAGMA journal_mode')[0][0].lower() != 'wal':
+            return 'not in WAL mode, nothing to do'
+        # TRUNCATE waits (up to busy_timeout) for readers, then empties the WAL file
+        busy, log_frames, checkpointed = self.pragma('PRAGMA wal_checkpoint(TRUNCATE)')[0]
+        if busy:
+            return f'busy, {checkpointed} of {log_frames} frames copied; the next run will finish it'
+        return 'complete, WAL truncated'
+
+    def file_sizes(self):
+        path = str(connection.settings_dict['NAME'])
+        sizes = {}
+        for suffix in ('', '-wal'):
+            try:
+                sizes[suffix or 'db'] = os.path.getsize(path + suffix)
+            except OSError:
+                sizes[suffix or 'db'] = 0
+        return sizes
+
+    def describe(self, sizes):
+        return f'database {self.mb(sizes["db"])}, WAL {self.mb(sizes["-wal"])}'
+
+    def mb(self, size):
+        return f'{size / 1024 / 1024:.2f} MB'
@@ -0,0 +1,121 @@
+from array import array
+from datetime import timedelta
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from thoughtify.models import Thought, EmotionTag, Like
+from thoughtify.management.commands.generate_sample_thoughts import (
+    THOUGHT_TEMPLATES, COMPLETIONS, sentiment_for,
+)
+
+class Command(BaseCommand):
+    help = 'Fills the database with a reproducible production-sized dataset for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--thoughts', type=int, default=100000)
+        parser.add_argument('--likes', type=int, default=500000,
+                            help='Like attempts; duplicates of an existing (user, thought) pair are skipped')
+        parser.add_argument('--days', type=int, default=365,
+                            help='Spread thought timestamps over this many past days')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--skew', type=float, default=3.0,
+                            help='Higher values concentrate activity on fewer users and thoughts')
+
+    def skewed_index(self, rng, size, skew):
+        # Power-law pick: index 0 is the most active user / most liked thought
+        return min(int(size * rng.random() ** skew), size - 1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        skew = options['skew']
+
+        call_command('setup_initial_data', stdout=self.stdout)
+        tags = [tag for tag in EmotionTag.objects.order_by('id') if tag.name in COMPLETIONS]
+        if not tags:
+            self.stdout.write(self.style.ERROR('No emotion tags found.'))
+            return
+
+        user_ids = self.create_users(options['users'], options['seed'], batch_size)
+        if not user_ids:
+            self.stdout.write(self.style.ERROR('No load test users available.'))
+            return
+        rng.shuffle(user_ids)
+        thought_ids = self.create_thoughts(rng, user_ids, tags, options, skew)
+        self.create_likes(rng, user_ids, thought_ids, options, skew)
+
+        call_command('sync_like_counts', batch_size=batch_size, stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS('Load test data generated!'))
+
+    def create_users(self, count, seed, batch_size):
+        prefix = f'load{seed}-'
+        # Hashing is the slow part of user creation; every load test user shares one hash
+        password = make_password('loadtest')
+        for start in range(0, count, batch_size):
+            users = [
+                User(username=f'{prefix}{n}@example.com', email=f'{prefix}{n}@example.com', password=password)
+                for n in range(start, min(start + batch_size, count))
+            ]
+            with transaction.atomic():
+                User.objects.bulk_create(users, ignore_conflicts=True)
+            self.stdout.write(f'Users: {min(start + batch_size, count)}/{count}')
+        call_command('create_user_profiles', batch_size=batch_size, seed=seed, stdout=self.stdout)
+        return list(
+            User.objects.filter(username__startswith=prefix).order_by('id').values_list('id', flat=True)
+        )
+
+    def create_thoughts(self, rng, user_ids, tags, options, skew):
+        count = options['thoughts']
+        batch_size = options['batch_size']
+        now = timezone.now()
+        span = options['days'] * 24 * 60 * 60
+        start_id = Thought.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+        for start in range(0, count, batch_size):
+            thoughts = []
+            for _ in range(min(batch_size, count - start)):
+                tag = rng.choice(tags)
+                content = rng.choice(THOUGHT_TEMPLATES).format(rng.choice(COMPLETIONS[tag.name]))
+                thoughts.append(Thought(
+                    author_id=user_ids[self.skewed_index(rng, len(user_ids), skew / 2)],
+                    content=content,
+                    emotion_tag=tag,
+                    sentiment=sentiment_for(tag.name),
+                    is_daily_thought=rng.random() < 0.2,
+                    is_public=rng.random() < 0.9,
+                    created_at=now - timedelta(seconds=rng.randrange(span or 1)),
+                ))
+            with transaction.atomic():
+                Thought.objects.bulk_create(thoughts)
+            self.stdout.write(f'Thoughts: {start + len(thoughts)}/{count}')
+
+        ids = array('q', Thought.objects.filter(id__gt=start_id).order_by('id').values_list('id', flat=True))
+        # Decouple popularity from age so the hot thoughts are spread across the feed
+        rng.shuffle(ids)
+        return ids
+
+    def create_likes(self, rng, user_ids, thought_ids, options, skew):
+        count = options['likes']
+        batch_size = options['batch_size']
+        if not thought_ids:
+            return
+        for start in range(0, count, batch_size):
+            pairs = set()
+            for _ in range(min(batch_size, count - start)):
+                pairs.add((
+                    rng.choice(user_ids),
+                    thought_ids[self.skewed_index(rng, len(thought_ids), skew)],
+                ))
+            with transaction.atomic():
+                Like.objects.bulk_create(
+                    [Like(user_id=user_id, thought_id=thought_id) for user_id, thought_id in pairs],
+                    ignore_conflicts=True,
+                )
+            self.stdout.write(f'Likes: {min(start + batch_size, count)}/{count}')
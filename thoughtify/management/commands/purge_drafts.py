@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+from thoughtify.models import DraftThought
+
+class Command(BaseCommand):
+    help = 'Deletes anonymous drafts older than DRAFT_THOUGHT_TTL in small batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Drafts deleted per transaction')
+        parser.add_argument('--pause', type=float, default=0.05,
+                            help='Seconds to sleep between batches so requests can take the write lock')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Count expired drafts without deleting them')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        # Fixed once, so drafts expiring mid-run don't keep the loop going
+        expired = DraftThought.objects.filter(created_at__lt=DraftThought.expiry_cutoff())
+
+        if options['dry_run']:
+            self.stdout.write(f'{expired.count()} expired drafts would be deleted')
+            return
+
+        deleted = 0
+        while True:
+            # Oldest first off the created_at index; each batch is its own short write
+            ids = list(expired.order_by('created_at').values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            deleted += DraftThought.objects.filter(id__in=ids).delete()[0]
+            self.stdout.write(f'Deleted {deleted} expired drafts so far')
+            if len(ids) < batch_size:
+                break
+            time.sleep(options['pause'])
+
+        self.stdout.write(self.style.SUCCESS(f'Purged {deleted} expired drafts'))
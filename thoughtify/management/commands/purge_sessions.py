@@ -0,0 +1,43 @@
+from importlib import import_module
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+class Command(BaseCommand):
+    help = 'Deletes expired database sessions in small batches (a batched clearsessions)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Sessions deleted per transaction')
+        parser.add_argument('--pause', type=float, default=0.05,
+                            help='Seconds to sleep between batches so requests can take the write lock')
+
+    def handle(self, *args, **options):
+        engine = import_module(settings.SESSION_ENGINE)
+        store = engine.SessionStore
+        if not hasattr(store, 'get_model_class'):
+            self.stdout.write(f'{settings.SESSION_ENGINE} keeps no sessions in the database, nothing to purge')
+            return
+
+        Session = store.get_model_class()
+        batch_size = options['batch_size']
+        now = timezone.now()
+        deleted = 0
+        while True:
+            # expire_date is indexed, so each batch is a range scan
+            keys = list(
+                Session.objects.filter(expire_date__lt=now)
+                .order_by('expire_date')
+                .values_list('session_key', flat=True)[:batch_size]
+            )
+            if not keys:
+                break
+            deleted += Session.objects.filter(session_key__in=keys).delete()[0]
+            self.stdout.write(f'Deleted {deleted} expired sessions so far')
+            if len(keys) < batch_size:
+                break
+            time.sleep(options['pause'])
+
+        self.stdout.write(self.style.SUCCESS(f'Purged {deleted} expired sessions'))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from thoughtify import trending
+
+class Command(BaseCommand):
+    help = 'Moves the trending score epoch to now, rescaling every score; run from cron at least daily'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Recompute every score from the Like table instead of rescaling. '
+                                 'Use once after upgrading, or to repair drift; likes made while it '
+                                 'runs are not counted until the next rebuild')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            scored = trending.rebuild()
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt trending scores for {scored} thoughts'))
+            return
+        rescaled, dropped = trending.rebase()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebased trending scores: {rescaled} rescaled, {dropped} decayed to zero'
+        ))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from thoughtify import rollups
+
+class Command(BaseCommand):
+    help = 'Recomputes the daily mood rollups and every user timeline from Thought, in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-days', type=int, default=30,
+                            help='Days of board rollups recounted per transaction')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Users whose timelines are recounted per transaction')
+
+    def handle(self, *args, **options):
+        if rollups.install():
+            self.stdout.write('Recreated missing rollup triggers')
+        total = rollups.rebuild(options['chunk_days'], progress=self.report_days)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt mood rollups: {total} rows'))
+        total = rollups.rebuild_timelines(options['batch_size'], progress=self.report_users)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt user timelines: {total} rows'))
+
+    def report_days(self, first, last, rows):
+        self.stdout.write(f'{first} to {last}: {rows} rows')
+
+    def report_users(self, users, rows):
+        self.stdout.write(f'{users} users: {rows} rows so far')
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from thoughtify import search
+from thoughtify.models import Thought
+
+class Command(BaseCommand):
+    help = 'Rebuilds the full-text search index from Thought.content'
+
+    def handle(self, *args, **kwargs):
+        if not search.fts_available():
+            self.stdout.write(self.style.WARNING('Full-text search needs SQLite; nothing to rebuild'))
+            return
+        search.install()
+        search.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt search index for {Thought.objects.count()} thoughts'
+        ))
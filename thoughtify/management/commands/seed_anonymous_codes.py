@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from thoughtify.models import AnonymousCode, CODE_POOL_LOW_WATERMARK, CODE_PREFIXES, CODE_WIDTHS
+
+class Command(BaseCommand):
+    help = ('Seeds anonymous code pools: the first pool of every prefix, and the next wider '
+            'pool once the current one is nearly used up. Optional: from cron it keeps the '
+            'one-off five digit seed out of a signup request')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', action='append', dest='prefixes',
+                            help='Prefix to seed; repeat for several. Defaults to every signup prefix')
+
+    def handle(self, *args, **options):
+        seeded = 0
+        for prefix in options['prefixes'] or CODE_PREFIXES:
+            for width in CODE_WIDTHS:
+                pool = AnonymousCode.objects.filter(prefix=prefix, width=width)
+                if not pool.exists():
+                    AnonymousCode.seed(prefix, width)
+                    seeded += 1
+                    self.stdout.write(f'Seeded {prefix} with {width} digit codes')
+                    break
+                # Only open the next width once this one runs low
+                if pool.filter(claimed=False).count() >= (10 ** width - 1) * CODE_POOL_LOW_WATERMARK:
+                    break
+        if seeded == 0:
+            self.stdout.write(self.style.SUCCESS('All anonymous code pools have room'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Seeded {seeded} anonymous code pools'))
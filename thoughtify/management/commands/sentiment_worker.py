@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+from thoughtify import sentiment
+from thoughtify.models import Thought
+
+class Command(BaseCommand):
+    help = 'Scores the sentiment of newly posted or edited thoughts in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--once', action='store_true',
+                            help='Drain the queue and exit instead of polling')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        # Load the model before polling so the first batch is not slowed down
+        sentiment.load()
+        self.stdout.write('Sentiment worker ready')
+
+        while True:
+            rows = Thought.pending_sentiment(batch_size)
+            if rows:
+                labels = sentiment.score_texts([content for _, content, _ in rows])
+                saved = Thought.save_sentiments(rows, labels)
+                self.stdout.write(f'Scored {saved} of {len(rows)} thoughts')
+                continue
+            if options['once']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from thoughtify.models import Thought, Like
+
+class Command(BaseCommand):
+    help = 'Rebuilds Thought.likes_count from the Like table in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of thoughts to reconcile per transaction')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report drifted counters without fixing them')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+        checked = 0
+        fixed = 0
+        last_id = 0
+
+        while True:
+            # Walk the table by primary key so each batch is an index range scan
+            batch = list(
+                Thought.objects.filter(id__gt=last_id)
+                .order_by('id')
+                .values_list('id', 'likes_count')[:batch_size]
+            )
+            if not batch:
+                break
+            last_id = batch[-1][0]
+            ids = [thought_id for thought_id, _ in batch]
+            actual = dict(
+                Like.objects.filter(thought_id__in=ids)
+                .values('thought_id')
+                .annotate(n=Count('id'))
+                .order_by()
+                .values_list('thought_id', 'n')
+            )
+            stale = [
+                Thought(id=thought_id, likes_count=actual.get(thought_id, 0))
+                for thought_id, stored in batch
+                if stored != actual.get(thought_id, 0)
+            ]
+            checked += len(batch)
+            fixed += len(stale)
+            if stale and not dry_run:
+                with transaction.atomic():
+                    Thought.objects.bulk_update(stale, ['likes_count'])
+            self.stdout.write(f'Checked {checked} thoughts, {fixed} drifted so far')
+
+        verb = 'Found' if dry_run else 'Fixed'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {fixed} drifted like counts out of {checked} thoughts'
+        ))
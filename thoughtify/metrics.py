@@ -0,0 +1,348 @@
+"""
+Request and application metrics.
+
+RequestMetricsMiddleware collects a RequestTimings for every request and
+records it here twice: per view in rolling windows of recent samples, so
+percentiles reflect current traffic, and in cumulative counters and
+histograms for /metrics.
+
+The cumulative totals live in each worker's memory and are flushed every few
+seconds to a JSON file per process in METRICS_DIR; /metrics sums the files,
+so every gunicorn worker is counted without an outside service. Files left by
+workers that have exited are folded into one archive file, so their counts
+still add up but the directory does not grow with every restart.
+"""
+from collections import deque
+import contextvars
+import json
+import os
+import tempfile
+import threading
+import time
+
+# Samples kept per view and metric
+WINDOW = 1000
+
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+class RequestTimings:
+    """What one request spent in SQL and template rendering"""
+    __slots__ = ('queries', 'sql_seconds', 'write_seconds', 'template_seconds')
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        # INSERT/UPDATE/DELETE time, which includes waiting for SQLite's write lock
+        self.write_seconds = 0.0
+        self.template_seconds = 0.0
+
+
+# The timings of the request being handled, if any
+current = contextvars.ContextVar('thoughtify_request_timings', default=None)
+
+
+def add_template_time(seconds):
+    timings = current.get()
+    if timings is not None:
+        timings.template_seconds += seconds
+
+
+class RollingHistogram:
+    """The last ``size`` samples of one measurement"""
+
+    def __init__(self, buckets, size=WINDOW):
+        self.buckets = buckets
+        self.samples = deque(maxlen=size)
+
+    def add(self, value):
+        self.samples.append(value)
+
+    def percentile(self, percent):
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+    def bucket_counts(self):
+        """Cumulative counts per upper bound, Prometheus style, ending with +Inf"""
+        counts = [0] * len(self.buckets)
+        for value in self.samples:
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+        return dict(zip(self.buckets, counts), **{'+Inf': len(self.samples)})
+
+    def snapshot(self):
+        return {
+            'count': len(self.samples),
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'max': max(self.samples, default=None),
+            'buckets': self.bucket_counts(),
+        }
+
+
+class ViewMetrics:
+    def __init__(self):
+        self.latency_ms = RollingHistogram(LATENCY_BUCKETS_MS)
+        self.sql_ms = RollingHistogram(LATENCY_BUCKETS_MS)
+        self.template_ms = RollingHistogram(LATENCY_BUCKETS_MS)
+        self.queries = RollingHistogram(QUERY_BUCKETS)
+        self.response_bytes = RollingHistogram(SIZE_BUCKETS)
+
+    def snapshot(self):
+        return {name: histogram.snapshot() for name, histogram in vars(self).items()}
+
+
+_views = {}
+_lock = threading.Lock()
+
+
+def record(view_name, seconds, timings, response_bytes=None):
+    with _lock:
+        metrics = _views.get(view_name)
+        if metrics is None:
+            metrics = _views[view_name] = ViewMetrics()
+        metrics.latency_ms.add(seconds * 1000)
+        metrics.sql_ms.add(timings.sql_seconds * 1000)
+        metrics.template_ms.add(timings.template_seconds * 1000)
+        metrics.queries.add(timings.queries)
+        if response_bytes is not None:
+            metrics.response_bytes.add(response_bytes)
+    observe('thoughtify_request_duration_seconds', seconds, REQUEST_BUCKETS_S, view=view_name)
+    inc('thoughtify_db_queries_total', timings.queries)
+    inc('thoughtify_db_query_seconds_total', timings.sql_seconds)
+    inc('thoughtify_db_write_seconds_total', timings.write_seconds)
+
+
+def snapshot():
+    """{view name: {metric: summary}} for this process"""
+    with _lock:
+        return {view_name: metrics.snapshot() for view_name, metrics in _views.items()}
+
+
+def reset():
+    with _lock:
+        _views.clear()
+        _totals.clear()
+
+
+# Cumulative metrics ---------------------------------------------------------
+
+REQUEST_BUCKETS_S = tuple(bound / 1000 for bound in LATENCY_BUCKETS_MS)
+
+HELP = {
+    'thoughtify_request_duration_seconds': 'Request latency by URL name',
+    'thoughtify_thoughts_created_total': 'Thoughts created',
+    'thoughtify_likes_created_total': 'Likes created',
+    'thoughtify_fragment_cache_requests_total': 'Template fragment cache lookups by fragment and result',
+    'thoughtify_db_connections_opened_total': 'Database connections opened',
+    'thoughtify_db_queries_total': 'SQL queries run by requests',
+    'thoughtify_db_query_seconds_total': 'Time requests spent in SQL',
+    'thoughtify_db_write_seconds_total': 'Time requests spent in writes, including waits for the SQLite write lock',
+    'thoughtify_db_locked_errors_total': 'Queries that gave up with "database is locked"',
+}
+
+# {(name, ((label, value), ...)): number} for this process
+_totals = {}
+_last_flush = 0.0
+# (pid, filename) this process flushes to
+_identity = None
+
+# Totals of workers that have exited
+ARCHIVE = 'exited.json'
+# Held by the worker pruning; one older than PRUNE_LOCK_TIMEOUT seconds was left by a crash
+PRUNE_LOCK = 'prune.lock'
+PRUNE_LOCK_TIMEOUT = 60
+
+
+def inc(name, value=1, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _totals[key] = _totals.get(key, 0) + value
+
+
+def observe(name, value, buckets, **labels):
+    """Add ``value`` to a cumulative Prometheus histogram"""
+    with _lock:
+        for bound in (*buckets, '+Inf'):
+            key = (f'{name}_bucket', tuple(sorted({**labels, 'le': str(bound)}.items())))
+            hit = bound == '+Inf' or value <= bound
+            _totals[key] = _totals.get(key, 0) + (1 if hit else 0)
+        for suffix, amount in (('_sum', value), ('_count', 1)):
+            key = (f'{name}{suffix}', tuple(sorted(labels.items())))
+            _totals[key] = _totals.get(key, 0) + amount
+
+
+def metrics_dir():
+    from django.conf import settings
+    return str(getattr(settings, 'METRICS_DIR', os.path.join(tempfile.gettempdir(), 'thoughtify-metrics')))
+
+
+def flush():
+    """Write this process's totals where the other workers' /metrics can read them"""
+    global _last_flush
+    with _lock:
+        rows = [[name, dict(labels), value] for (name, labels), value in _totals.items()]
+        _last_flush = time.monotonic()
+    directory = metrics_dir()
+    os.makedirs(directory, exist_ok=True)
+    _write_rows(os.path.join(directory, _own_filename()), rows)
+
+
+def _own_filename():
+    global _identity
+    pid = os.getpid()
+    if _identity is None or _identity[0] != pid:
+        # Stamped with a start time, so a new worker that reuses a dead
+        # worker's pid writes a file of its own instead of replacing the old one
+        _identity = (pid, f'{pid}-{time.time_ns()}.json')
+    return _identity[1]
+
+
+def _write_rows(path, rows):
+    # Write then rename, so a reader never sees half a file
+    with tempfile.NamedTemporaryFile('w', dir=os.path.dirname(path), suffix='.tmp', delete=False) as handle:
+        json.dump(rows, handle)
+    os.replace(handle.name, path)
+
+
+def _read_rows(path):
+    try:
+        with open(path) as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return []
+
+
+def _add_rows(combined, rows):
+    for name, labels, value in rows:
+        key = (name, tuple(sorted(labels.items())))
+        combined[key] = combined.get(key, 0) + value
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _exited_files(directory):
+    """Per-process files whose process is gone: its pid is dead, or a newer file has the same pid"""
+    by_pid = {}
+    for filename in os.listdir(directory):
+        if filename == ARCHIVE or not filename.endswith('.json'):
+            continue
+        pid, _, started = filename[:-len('.json')].partition('-')
+        try:
+            by_pid.setdefault(int(pid), []).append((int(started or 0), filename))
+        except ValueError:
+            continue
+    exited = []
+    for pid, files in by_pid.items():
+        files.sort()
+        if pid == os.getpid() or _pid_alive(pid):
+            # Only the newest file belongs to the running process
+            files = files[:-1]
+        exited.extend(filename for _, filename in files)
+    return exited
+
+
+def _take_prune_lock(path):
+    for _ in range(2):
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(path) < PRUNE_LOCK_TIMEOUT:
+                    return False
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+    return False
+
+
+def prune():
+    """Fold the files of exited workers into ARCHIVE and delete them"""
+    directory = metrics_dir()
+    exited = _exited_files(directory)
+    if not exited:
+        return
+    # One worker at a time, or two scrapes could both count the same file
+    lock_path = os.path.join(directory, PRUNE_LOCK)
+    if not _take_prune_lock(lock_path):
+        return
+    try:
+        archive_path = os.path.join(directory, ARCHIVE)
+        combined = {}
+        for filename in (ARCHIVE, *exited):
+            _add_rows(combined, _read_rows(os.path.join(directory, filename)))
+        _write_rows(archive_path, [[name, dict(labels), value] for (name, labels), value in combined.items()])
+        for filename in exited:
+            os.remove(os.path.join(directory, filename))
+    finally:
+        os.remove(lock_path)
+
+
+def maybe_flush(interval=5):
+    if time.monotonic() - _last_flush >= interval:
+        flush()
+
+
+def collect():
+    """Totals summed over every worker's file, this process and exited workers included"""
+    flush()
+    prune()
+    directory = metrics_dir()
+    combined = {}
+    for filename in os.listdir(directory):
+        if not filename.endswith('.json'):
+            continue
+        _add_rows(combined, _read_rows(os.path.join(directory, filename)))
+    return combined
+
+
+def family(name):
+    for suffix in ('_bucket', '_sum', '_count'):
+        if name.endswith(suffix) and name[:-len(suffix)] in HELP:
+            return name[:-len(suffix)]
+    return name
+
+
+def render(totals, gauges=()):
+    """Prometheus text exposition of ``totals`` plus (name, help, value) gauges"""
+    lines = []
+    families = {}
+    for (name, labels), value in sorted(totals.items(), key=bucket_order):
+        families.setdefault(family(name), []).append((name, labels, value))
+    for name, samples in families.items():
+        kind = 'histogram' if samples[0][0] != name else 'counter'
+        lines.append(f'# HELP {name} {HELP.get(name, name)}')
+        lines.append(f'# TYPE {name} {kind}')
+        lines.extend(sample_line(*sample) for sample in samples)
+    for name, help_text, value in gauges:
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} gauge', sample_line(name, (), value)]
+    return '\n'.join(lines) + '\n'
+
+
+def bucket_order(item):
+    # Buckets must be listed in increasing order of their bound, +Inf last
+    (name, labels), _ = item
+    le = dict(labels).get('le')
+    bound = float('inf') if le == '+Inf' else float(le) if le is not None else 0.0
+    return family(name), [pair for pair in labels if pair[0] != 'le'], name, bound
+
+
+def sample_line(name, labels, value):
+    if labels:
+        pairs = ','.join(f'{label}="{label_value}"' for label, label_value in labels)
+        name = f'{name}{{{pairs}}}'
+    return f'{name} {value}'
@@ -0,0 +1,115 @@
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import OperationalError, connection
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE')
+
+
+def add_execute_wrapper(wrapper):
+    connection.execute_wrappers.append(wrapper)
+
+
+def remove_execute_wrapper(wrapper):
+    connection.execute_wrappers.remove(wrapper)
+
+
+class RequestMetricsMiddleware:
+    """
+    Count queries and time SQL, templates and the whole request, per view.
+
+    Results go to the rolling histograms in thoughtify.metrics and, when
+    SERVER_TIMING is on, to a Server-Timing header that browser dev tools
+    show next to the request. Views over their QUERY_BUDGETS entry (or
+    DEFAULT_QUERY_BUDGET) log a warning, which is how N+1 queries surface.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # Stay async under ASGI, or Django would run async views in a thread
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.budgets = getattr(settings, 'QUERY_BUDGETS', {})
+        self.default_budget = getattr(settings, 'DEFAULT_QUERY_BUDGET', None)
+        self.server_timing = getattr(settings, 'SERVER_TIMING', True)
+        self.flush_interval = getattr(settings, 'METRICS_FLUSH_INTERVAL', 5)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings = metrics.RequestTimings()
+        token = metrics.current.set(timings)
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(self.time_query(timings)):
+                response = self.get_response(request)
+        finally:
+            metrics.current.reset(token)
+        return self.finish(request, response, time.perf_counter() - start, timings)
+
+    async def __acall__(self, request):
+        timings = metrics.RequestTimings()
+        token = metrics.current.set(timings)
+        start = time.perf_counter()
+        # The async ORM runs queries on the connection of the request's sync
+        # worker thread, which is not the one this coroutine sees, so the
+        # wrapper has to be installed from that thread
+        wrapper = self.time_query(timings)
+        await sync_to_async(add_execute_wrapper)(wrapper)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(remove_execute_wrapper)(wrapper)
+            metrics.current.reset(token)
+        return self.finish(request, response, time.perf_counter() - start, timings)
+
+    def finish(self, request, response, elapsed, timings):
+        match = request.resolver_match
+        view_name = match.view_name if match else 'unresolved'
+        size = None if response.streaming else len(response.content)
+        metrics.record(view_name, elapsed, timings, size)
+        metrics.maybe_flush(self.flush_interval)
+
+        if self.server_timing:
+            response['Server-Timing'] = self.server_timing_header(elapsed, timings, size)
+        budget = self.budgets.get(view_name, self.default_budget)
+        if budget is not None and timings.queries > budget:
+            logger.warning('%s ran %d queries, over its budget of %d (%s %s)',
+                           view_name, timings.queries, budget, request.method, request.path)
+        return response
+
+    def time_query(self, timings):
+        def wrapper(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            except OperationalError as exc:
+                if 'locked' in str(exc):
+                    metrics.inc('thoughtify_db_locked_errors_total')
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                timings.queries += 1
+                timings.sql_seconds += elapsed
+                if sql.startswith(WRITE_STATEMENTS):
+                    timings.write_seconds += elapsed
+        return wrapper
+
+    def server_timing_header(self, elapsed, timings, size):
+        entries = [
+            f'db;dur={timings.sql_seconds * 1000:.1f};desc="{timings.queries} queries"',
+            f'tpl;dur={timings.template_seconds * 1000:.1f}',
+            f'total;dur={elapsed * 1000:.1f}',
+        ]
+        if size is not None:
+            entries.append(f'size;desc="{size} bytes"')
+        return ', '.join(entries)
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:08
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_likes_count(apps, schema_editor):
+    Thought = apps.get_model('thoughtify', 'Thought')
+    Like = apps.get_model('thoughtify', 'Like')
+    counts = Like.objects.values('thought_id').annotate(n=Count('id')).order_by()
+    for row in counts.iterator():
+        Thought.objects.filter(pk=row['thought_id']).update(likes_count=row['n'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('thoughtify', '0005_remove_userprofile_bio_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='thought',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_likes_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('thoughtify', '0006_thought_likes_count'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='userprofile',
+            name='anonymous_code',
+            field=models.CharField(max_length=8, unique=True),
+        ),
+        migrations.CreateModel(
+            name='AnonymousCode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=8, unique=True)),
+                ('prefix', models.CharField(max_length=1)),
+                ('width', models.PositiveSmallIntegerField()),
+                ('claimed', models.BooleanField(default=False)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['prefix', 'width', 'claimed'], name='thoughtify__prefix_6ce432_idx')],
+            },
+        ),
+    ]
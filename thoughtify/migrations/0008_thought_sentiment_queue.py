@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('thoughtify', '0007_anonymouscode_pool'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='thought',
+            name='sentiment_scored_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='thought',
+            index=models.Index(condition=models.Q(('sentiment_scored_at__isnull', True)), fields=['id'], name='thought_sentiment_pending_idx'),
+        ),
+    ]
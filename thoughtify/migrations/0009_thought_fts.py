@@ -0,0 +1,27 @@
+from django.db import migrations
+
+
+def create_fts(apps, schema_editor):
+    from thoughtify import search
+    if search.install(schema_editor.connection):
+        search.rebuild(schema_editor.connection)
+
+
+def drop_fts(apps, schema_editor):
+    from thoughtify import search
+    if not search.fts_available(schema_editor.connection):
+        return
+    for name in search.TRIGGERS:
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {name}')
+    schema_editor.execute(f'DROP TABLE IF EXISTS {search.FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('thoughtify', '0008_thought_sentiment_queue'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts, drop_fts),
+    ]
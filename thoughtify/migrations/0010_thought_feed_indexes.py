@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('thoughtify', '0009_thought_fts'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='thought',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['created_at'], name='thought_public_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='thought',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['emotion_tag', 'created_at'], name='thought_public_tag_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='thought',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['sentiment', 'created_at'], name='thought_public_sentiment_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='thought',
+            index=models.Index(condition=models.Q(('is_daily_thought', True), ('is_public', True)), fields=['created_at'], name='thought_public_daily_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('thoughtify', '0010_thought_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='draftthought',
+            index=models.Index(fields=['session_key', 'created_at'], name='draft_session_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='draftthought',
+            index=models.Index(fields=['created_at'], name='draft_created_idx'),
+        ),
+    ]
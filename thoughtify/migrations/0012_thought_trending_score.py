@@ -0,0 +1,51 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:40
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def backfill_trending_scores(apps, schema_editor):
+    # Same weights as thoughtify.trending.rebuild, with the epoch at migration time
+    Thought = apps.get_model('thoughtify', 'Thought')
+    Like = apps.get_model('thoughtify', 'Like')
+    TrendingEpoch = apps.get_model('thoughtify', 'TrendingEpoch')
+    now = django.utils.timezone.now()
+    half_life = getattr(settings, 'TRENDING_HALF_LIFE', 6 * 3600)
+    scores = {}
+    likes = Like.objects.filter(created_at__gte=now - timedelta(seconds=half_life * 7))
+    for thought_id, created_at in likes.values_list('thought_id', 'created_at').iterator():
+        weight = 2 ** ((created_at - now).total_seconds() / half_life)
+        scores[thought_id] = scores.get(thought_id, 0.0) + weight
+    TrendingEpoch.objects.create(pk=1, epoch=now)
+    for thought_id, score in scores.items():
+        Thought.objects.filter(pk=thought_id).update(trending_score=score)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('thoughtify', '0011_draftthought_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingEpoch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('epoch', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='thought',
+            name='trending_score',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddIndex(
+            model_name='thought',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['trending_score'], name='thought_public_trending_idx'),
+        ),
+        migrations.RunPython(backfill_trending_scores, migrations.RunPython.noop),
+    ]
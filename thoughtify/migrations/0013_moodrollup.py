@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('thoughtify', '0012_thought_trending_score'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MoodRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('sentiment', models.CharField(choices=[('positive', 'Positive'), ('neutral', 'Neutral'), ('negative', 'Negative')], max_length=10)),
+                ('thoughts', models.PositiveIntegerField(default=0)),
+                ('emotion_tag', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='thoughtify.emotiontag')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='moodrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'emotion_tag', 'sentiment'), name='mood_rollup_key'),
+        ),
+    ]
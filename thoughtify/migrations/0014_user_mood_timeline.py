@@ -0,0 +1,62 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:46
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from datetime import timedelta
+
+
+def backfill_daily_streaks(apps, schema_editor):
+    # Walk each user's daily thoughts back from last_daily_thought while the days are consecutive
+    UserProfile = apps.get_model('thoughtify', 'UserProfile')
+    Thought = apps.get_model('thoughtify', 'Thought')
+    for profile in UserProfile.objects.exclude(last_daily_thought=None).iterator():
+        days = sorted({
+            created_at.date() for created_at in
+            Thought.objects.filter(author_id=profile.user_id, is_daily_thought=True).values_list('created_at', flat=True)
+        } | {profile.last_daily_thought})
+        streak = longest = 0
+        previous = None
+        for day in days:
+            streak = streak + 1 if previous == day - timedelta(days=1) else 1
+            longest = max(longest, streak)
+            previous = day
+        UserProfile.objects.filter(pk=profile.pk).update(daily_streak=streak, longest_daily_streak=longest)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('thoughtify', '0013_moodrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='daily_streak',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='longest_daily_streak',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='UserMoodRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('week', 'Week'), ('month', 'Month')], max_length=5)),
+                ('starts_on', models.DateField()),
+                ('sentiment', models.CharField(choices=[('positive', 'Positive'), ('neutral', 'Neutral'), ('negative', 'Negative')], max_length=10)),
+                ('thoughts', models.PositiveIntegerField(default=0)),
+                ('emotion_tag', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='thoughtify.emotiontag')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='usermoodrollup',
+            constraint=models.UniqueConstraint(fields=('user', 'period', 'starts_on', 'emotion_tag', 'sentiment'), name='user_mood_rollup_key'),
+        ),
+        migrations.RunPython(backfill_daily_streaks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+import random
+import string
+
+from django.db import migrations
+
+# AnonymousCode.CODE_PREFIXES; other first characters share the X pool
+PREFIXES = string.ascii_uppercase + string.digits
+WIDTH = 3
+
+
+def seed_narrowest_pools(apps, schema_editor):
+    # Seed the first pool of every prefix here so signups never have to
+    AnonymousCode = apps.get_model('thoughtify', 'AnonymousCode')
+    UserProfile = apps.get_model('thoughtify', 'UserProfile')
+    taken = set(UserProfile.objects.values_list('anonymous_code', flat=True))
+    for prefix in PREFIXES:
+        if AnonymousCode.objects.filter(prefix=prefix, width=WIDTH).exists():
+            continue
+        codes = [f"{prefix}{n:0{WIDTH}d}" for n in range(1, 10 ** WIDTH)]
+        random.shuffle(codes)
+        AnonymousCode.objects.bulk_create(
+            [AnonymousCode(code=code, prefix=prefix, width=WIDTH, claimed=code in taken) for code in codes],
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('thoughtify', '0014_user_mood_timeline'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_narrowest_pools, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+import random
+import string
+
+from django.db import migrations
+
+PREFIXES = string.ascii_uppercase + string.digits
+WIDTH = 4
+
+
+def seed_four_digit_pools(apps, schema_editor):
+    # Ready before any three digit pool runs out; five digit pools are seeded on first use
+    AnonymousCode = apps.get_model('thoughtify', 'AnonymousCode')
+    UserProfile = apps.get_model('thoughtify', 'UserProfile')
+    taken = set(UserProfile.objects.values_list('anonymous_code', flat=True))
+    for prefix in PREFIXES:
+        if AnonymousCode.objects.filter(prefix=prefix, width=WIDTH).exists():
+            continue
+        codes = [f"{prefix}{n:0{WIDTH}d}" for n in range(1, 10 ** WIDTH)]
+        random.shuffle(codes)
+        AnonymousCode.objects.bulk_create(
+            [AnonymousCode(code=code, prefix=prefix, width=WIDTH, claimed=code in taken) for code in codes],
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('thoughtify', '0015_seed_anonymous_codes'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_four_digit_pools, migrations.RunPython.noop),
+    ]
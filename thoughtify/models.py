@@ -1,9 +1,17 @@
-from django.db import models
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, models, transaction
+from django.db.models.functions import Greatest
 from django.contrib.auth.models import User
 from django.utils import timezone
+import logging
 import random
+import string
 from django.core.validators import FileExtensionValidator
 
+logger = logging.getLogger(__name__)
+
 class EmotionTag(models.Model):
     name = models.CharField(max_length=50, unique=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -22,11 +30,97 @@ EMOJI_CHOICES = [
     ('🤠', 'Cowboy'),
 ]
 
+# Digits after the first letter of an anonymous code. Each wider format is only
+# opened once every code of the narrower one has been handed out.
+CODE_WIDTHS = (3, 4, 5)
+# First characters with a pool of their own; usernames starting with anything
+# else (email local parts may begin with _ + ! ' and more) share the fallback
+CODE_PREFIXES = string.ascii_uppercase + string.digits
+CODE_FALLBACK_PREFIX = 'X'
+# Warn once fewer than this fraction of a pool's codes are still free
+CODE_POOL_LOW_WATERMARK = 0.1
+
+class AnonymousCode(models.Model):
+    """Pre-shuffled pool of anonymous codes, claimed one row at a time"""
+    code = models.CharField(max_length=8, unique=True)
+    prefix = models.CharField(max_length=1)
+    width = models.PositiveSmallIntegerField()
+    claimed = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['prefix', 'width', 'claimed']),
+        ]
+
+    def __str__(self):
+        return self.code
+
+    @classmethod
+    def seed(cls, prefix, width):
+        """Fill the pool for one prefix and width in random order, marking codes already in use"""
+        taken = {
+            code for code in UserProfile.objects.filter(anonymous_code__startswith=prefix)
+            .values_list('anonymous_code', flat=True)
+            if len(code) == width + 1
+        }
+        codes = [f"{prefix}{n:0{width}d}" for n in range(1, 10 ** width)]
+        random.shuffle(codes)
+        # Rows are claimed in id order, so insertion order is the shuffle
+        cls.objects.bulk_create(
+            [cls(code=code, prefix=prefix, width=width, claimed=code in taken) for code in codes],
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+
+    @staticmethod
+    def prefix_for(username):
+        prefix = username[:1].upper()
+        return prefix if prefix in CODE_PREFIXES else CODE_FALLBACK_PREFIX
+
+    @classmethod
+    def claim(cls, prefix):
+        """
+        Hand out the next free code for ``prefix``, moving to a wider format
+        only once the narrower pool has none left.
+
+        Migrations seed the three and four digit pools. A five digit pool
+        (99,999 rows) is seeded here the first time a prefix needs it, unless
+        seed_anonymous_codes got there first.
+        """
+        for width in CODE_WIDTHS:
+            pool = cls.objects.filter(prefix=prefix, width=width)
+            if not pool.exists():
+                cls.seed(prefix, width)
+            while True:
+                candidate = pool.filter(claimed=False).order_by('id').values_list('id', 'code').first()
+                if candidate is None:
+                    break
+                # Conditional update: only one concurrent signup can flip the row,
+                # the others go round again for the next free one
+                if cls.objects.filter(id=candidate[0], claimed=False).update(claimed=True):
+                    cls._check_remaining(prefix, width)
+                    return candidate[1]
+        raise RuntimeError(f"No anonymous codes left for prefix {prefix!r}")
+
+    @classmethod
+    def _check_remaining(cls, prefix, width):
+        remaining = cls.objects.filter(prefix=prefix, width=width, claimed=False).count()
+        capacity = 10 ** width - 1
+        if remaining < capacity * CODE_POOL_LOW_WATERMARK:
+            logger.warning(
+                "Anonymous code pool for %s (%d digits) is nearly used up: %d of %d left; "
+                "run seed_anonymous_codes",
+                prefix, width, remaining, capacity,
+            )
+
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
-    anonymous_code = models.CharField(max_length=4, unique=True)
+    anonymous_code = models.CharField(max_length=8, unique=True)
     show_public_thoughts = models.BooleanField(default=True)
     last_daily_thought = models.DateField(null=True, blank=True)
+    # Consecutive days with a daily thought, up to last_daily_thought
+    daily_streak = models.PositiveIntegerField(default=0)
+    longest_daily_streak = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     email_confirmed = models.BooleanField(default=False)
@@ -37,18 +131,31 @@ class UserProfile(models.Model):
 
     @staticmethod
     def generate_anonymous_code(username):
-        first_letter = username[0].upper()
-        while True:
-            random_number = random.randint(1, 999)
-            code = f"{first_letter}{random_number:03d}"
-            if not UserProfile.objects.filter(anonymous_code=code).exists():
-                return code
+        return AnonymousCode.claim(AnonymousCode.prefix_for(username))
 
     def can_post_daily_thought(self):
         if not self.last_daily_thought:
             return True
         return self.last_daily_thought < timezone.now().date()
 
+    def record_daily_thought(self, day):
+        """Extend the streak if ``day`` follows the last daily thought, else start a new one"""
+        if self.last_daily_thought == day:
+            return
+        if self.last_daily_thought == day - timedelta(days=1):
+            self.daily_streak += 1
+        else:
+            self.daily_streak = 1
+        self.longest_daily_streak = max(self.longest_daily_streak, self.daily_streak)
+        self.last_daily_thought = day
+
+    def current_daily_streak(self, today=None):
+        """The streak still alive today: it survives until a whole day passes without a daily thought"""
+        today = today or timezone.now().date()
+        if self.last_daily_thought is None or self.last_daily_thought < today - timedelta(days=1):
+            return 0
+        return self.daily_streak
+
 class Like(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     thought = models.ForeignKey('Thought', on_delete=models.CASCADE, related_name='likes')
@@ -60,6 +167,80 @@ class Like(models.Model):
     def __str__(self):
         return f"{self.user.username} likes {self.thought.id}"
 
+    @staticmethod
+    def liked_thought_ids(user, thoughts):
+        """Ids of ``thoughts`` liked by ``user``, fetched with a single IN query"""
+        if not user.is_authenticated:
+            return set()
+        thought_ids = [thought.id for thought in thoughts]
+        if not thought_ids:
+            return set()
+        return set(
+            Like.objects.filter(user=user, thought_id__in=thought_ids)
+            .values_list('thought_id', flat=True)
+        )
+
+    @staticmethod
+    async def aliked_thought_ids(user, thoughts):
+        """Async liked_thought_ids, for views running on the event loop"""
+        if not user.is_authenticated:
+            return set()
+        thought_ids = [thought.id for thought in thoughts]
+        if not thought_ids:
+            return set()
+        return {
+            thought_id async for thought_id in
+            Like.objects.filter(user=user, thought_id__in=thought_ids).values_list('thought_id', flat=True)
+        }
+
+    @staticmethod
+    def toggle(user, thought_id):
+        """
+        Like or unlike a thought and keep its counter and trending score in step.
+
+        Returns (liked, likes_count); raises Thought.DoesNotExist, rolling
+        the toggle back, if there is no such thought.
+        """
+        from . import trending
+        with transaction.atomic():
+            # Try the unlike first: one DELETE tells us which way the toggle goes,
+            # and holding the write lock before any read keeps the epoch current
+            unliked_at = Like._delete(user, thought_id)
+            liked = unliked_at is None
+            epoch = TrendingEpoch.current()
+            if liked:
+                like = Like.objects.create(user=user, thought_id=thought_id)
+                score_change = trending.like_weight(like.created_at, epoch)
+            else:
+                score_change = -trending.like_weight(unliked_at, epoch)
+            trending_score = Greatest(models.F('trending_score') + score_change, 0.0)
+            if not liked:
+                # Rounding must not leave a thought with no likes a residue of score
+                trending_score = models.Case(models.When(likes_count__lte=1, then=0.0), default=trending_score)
+            updated = Thought.objects.filter(pk=thought_id).update(
+                likes_count=models.F('likes_count') + (1 if liked else -1),
+                trending_score=trending_score,
+            )
+            if not updated:
+                raise Thought.DoesNotExist('Thought not found')
+            likes_count = Thought.objects.filter(pk=thought_id).values_list('likes_count', flat=True).get()
+        return liked, likes_count
+
+    @staticmethod
+    def _delete(user, thought_id):
+        """Delete ``user``'s like of a thought; returns when it was made, or None if there was none"""
+        table = connection.ops.quote_name(Like._meta.db_table)
+        with connection.cursor() as cursor:
+            # RETURNING reads the like's age in the same statement that removes it
+            cursor.execute(
+                f'DELETE FROM {table} WHERE user_id = %s AND thought_id = %s RETURNING created_at',
+                [user.pk, thought_id],
+            )
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        return connection.ops.convert_datetimefield_value(row[0], None, connection)
+
 class Thought(models.Model):
     SENTIMENT_CHOICES = [
         ('positive', 'Positive'),
@@ -81,12 +262,36 @@ class Thought(models.Model):
     is_public = models.BooleanField(default=True)
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
+    # Denormalized from Like; kept in step by like_thought, repaired by sync_like_counts
+    likes_count = models.PositiveIntegerField(default=0)
+    # Null until the sentiment worker has scored the current content
+    sentiment_scored_at = models.DateTimeField(null=True, blank=True)
+    # Likes decayed by age, measured from TrendingEpoch; see thoughtify.trending
+    trending_score = models.FloatField(default=0.0)
 
     class Meta:
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['-created_at']),
             models.Index(fields=['author', '-created_at']),
+            # One index per feed variant so each is an ordered index range, never a sort.
+            # Django renders is_public=True as a bare boolean column, which SQLite can
+            # only match against a partial index condition, not an indexed column.
+            # created_at is ascending so a backwards scan also yields id DESC.
+            models.Index(fields=['created_at'], name='thought_public_feed_idx',
+                         condition=models.Q(is_public=True)),
+            models.Index(fields=['emotion_tag', 'created_at'], name='thought_public_tag_idx',
+                         condition=models.Q(is_public=True)),
+            models.Index(fields=['sentiment', 'created_at'], name='thought_public_sentiment_idx',
+                         condition=models.Q(is_public=True)),
+            models.Index(fields=['created_at'], name='thought_public_daily_idx',
+                         condition=models.Q(is_public=True, is_daily_thought=True)),
+            # The trending page reads this backwards, best score first
+            models.Index(fields=['trending_score'], name='thought_public_trending_idx',
+                         condition=models.Q(is_public=True)),
+            # The sentiment queue: only unscored rows are indexed
+            models.Index(fields=['id'], name='thought_sentiment_pending_idx',
+                         condition=models.Q(sentiment_scored_at__isnull=True)),
         ]
 
     def __str__(self):
@@ -94,15 +299,86 @@ class Thought(models.Model):
             return f"{self.author.userprofile.anonymous_code}: {self.content[:50]}..."
         return f"Anonymous: {self.content[:50]}..."
 
+    @staticmethod
+    def pending_sentiment(limit, after_id=0, rescore=False):
+        """Next batch of (id, content, updated_at) rows waiting for a sentiment score"""
+        queryset = Thought.objects.filter(id__gt=after_id)
+        if not rescore:
+            queryset = queryset.filter(sentiment_scored_at__isnull=True)
+        return list(queryset.order_by('id').values_list('id', 'content', 'updated_at')[:limit])
+
+    @staticmethod
+    def save_sentiments(rows, labels):
+        """Store scores, skipping any thought edited since its content was read"""
+        now = timezone.now()
+        saved = 0
+        with transaction.atomic():
+            for (thought_id, _, updated_at), label in zip(rows, labels):
+                saved += Thought.objects.filter(id=thought_id, updated_at=updated_at).update(
+                    sentiment=label, sentiment_scored_at=now
+                )
+        return saved
+
     @property
     def author_code(self):
         if self.author and hasattr(self.author, 'userprofile'):
             return self.author.userprofile.anonymous_code
         return 'Anonymous'
 
-    @property
-    def likes_count(self):
-        return self.likes.count()
+class MoodRollup(models.Model):
+    """Thoughts written per UTC day, emotion tag and sentiment; triggers keep it current, see thoughtify.rollups"""
+    day = models.DateField()
+    # No database constraint: deleting a tag empties and removes its rows through the triggers
+    emotion_tag = models.ForeignKey(EmotionTag, on_delete=models.DO_NOTHING, null=True,
+                                    db_constraint=False, related_name='+')
+    sentiment = models.CharField(max_length=10, choices=Thought.SENTIMENT_CHOICES)
+    thoughts = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Leading on day, so a date range is one index range
+            models.UniqueConstraint(fields=['day', 'emotion_tag', 'sentiment'], name='mood_rollup_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.emotion_tag_id} {self.sentiment}: {self.thoughts}"
+
+class UserMoodRollup(models.Model):
+    """One author's thoughts per week or month, emotion tag and sentiment; triggers keep it current"""
+    PERIOD_CHOICES = [
+        ('week', 'Week'),
+        ('month', 'Month'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    # The Monday of the week or the 1st of the month, in UTC
+    starts_on = models.DateField()
+    emotion_tag = models.ForeignKey(EmotionTag, on_delete=models.DO_NOTHING, null=True,
+                                    db_constraint=False, related_name='+')
+    sentiment = models.CharField(max_length=10, choices=Thought.SENTIMENT_CHOICES)
+    thoughts = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # A timeline is one range of this index
+            models.UniqueConstraint(fields=['user', 'period', 'starts_on', 'emotion_tag', 'sentiment'],
+                                    name='user_mood_rollup_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.period} {self.starts_on} {self.emotion_tag_id} {self.sentiment}: {self.thoughts}"
+
+class TrendingEpoch(models.Model):
+    """The single row holding the time every trending score is measured from"""
+    epoch = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return self.epoch.isoformat()
+
+    @classmethod
+    def current(cls):
+        return cls.objects.get_or_create(pk=1)[0].epoch
 
 class DraftThought(models.Model):
     """Store thoughts from non-logged-in users temporarily"""
@@ -111,6 +387,36 @@ class DraftThought(models.Model):
     session_key = models.CharField(max_length=40)
     created_at = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        indexes = [
+            # Signup looks up the visitor's live drafts; the purge walks created_at
+            models.Index(fields=['session_key', 'created_at'], name='draft_session_idx'),
+            models.Index(fields=['created_at'], name='draft_created_idx'),
+        ]
+
+    @staticmethod
+    def expiry_cutoff():
+        """Drafts created before this have expired"""
+        return timezone.now() - timedelta(seconds=getattr(settings, 'DRAFT_THOUGHT_TTL', 86400))
+
+    @classmethod
+    def publish_pending(cls, user, session_key):
+        """Publish every unexpired draft from ``session_key`` as ``user``; returns the new thoughts"""
+        if not session_key:
+            return []
+        drafts = list(cls.objects.filter(session_key=session_key, created_at__gte=cls.expiry_cutoff())
+                      .order_by('created_at'))
+        if not drafts:
+            return []
+        with transaction.atomic():
+            # One insert per draft, so post_save counts and live-pushes each like any new thought
+            thoughts = [
+                Thought.objects.create(author=user, content=draft.content, emotion_tag_id=draft.emotion_tag_id)
+                for draft in drafts
+            ]
+            cls.objects.filter(pk__in=[draft.pk for draft in drafts]).delete()
+        return thoughts
+
     def publish(self, user):
         """Convert draft to actual thought"""
         thought = Thought.objects.create(
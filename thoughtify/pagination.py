@@ -0,0 +1,112 @@
+import base64
+import binascii
+
+from django.utils.dateparse import parse_datetime
+
+
+def pack_cursor(*parts):
+    """Encode key values as an opaque, URL-safe cursor"""
+    raw = '|'.join(str(part) for part in parts).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def unpack_cursor(cursor, count):
+    """Split a cursor back into ``count`` strings, or None if it is missing or malformed"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        parts = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        return None
+    if len(parts) != count:
+        return None
+    return parts
+
+
+def encode_cursor(created_at, pk):
+    return pack_cursor(created_at.isoformat(), pk)
+
+
+def decode_cursor(cursor):
+    """Return (created_at, pk) for a cursor, or None if it is missing or malformed"""
+    parts = unpack_cursor(cursor, 2)
+    if parts is None:
+        return None
+    try:
+        created_at = parse_datetime(parts[0])
+        pk = int(parts[1])
+    except ValueError:
+        return None
+    if created_at is None:
+        return None
+    return created_at, pk
+
+
+class KeysetPage:
+    def __init__(self, object_list, has_next, next_cursor):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    Paginate a queryset newest-first on (created_at, id) without COUNT or OFFSET.
+
+    Each page seeks past the last row of the previous one, so it is served
+    straight from the created_at index (SQLite keeps the rowid in every index,
+    which covers the id tie-break) and costs the same however deep you scroll.
+    """
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = per_page
+
+    def page_queryset(self, cursor=None):
+        """The single query behind a page, one row longer than the page"""
+        queryset = self.queryset.order_by('-created_at', '-id')
+        position = decode_cursor(cursor)
+        if position is not None:
+            created_at, pk = position
+            # Same as (created_at, id) < (created_at, pk), written as a range on
+            # created_at so SQLite can seek the index instead of sorting an OR
+            queryset = queryset.filter(created_at__lte=created_at).exclude(
+                created_at=created_at, id__gte=pk
+            )
+        # Fetch one extra row to learn whether another page exists
+        return queryset[:self.per_page + 1]
+
+    def get_page(self, cursor=None):
+        return self.make_page(list(self.page_queryset(cursor)))
+
+    async def aget_page(self, cursor=None):
+        return self.make_page([row async for row in self.page_queryset(cursor)])
+
+    def make_page(self, rows):
+        has_next = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        next_cursor = None
+        if has_next:
+            last = rows[-1]
+            next_cursor = encode_cursor(last.created_at, last.pk)
+        return KeysetPage(rows, has_next, next_cursor)
+
+
+def next_page_url(request, page):
+    """URL of the page after ``page``, keeping the rest of the query string"""
+    if not page.has_next:
+        return None
+    params = request.GET.copy()
+    params.pop('page', None)
+    params['cursor'] = page.next_cursor
+    return f"{request.path}?{params.urlencode()}"
@@ -0,0 +1,55 @@
+"""
+Give back the thread Django's ASGI handler keeps for a long-lived response.
+
+Under ASGI every request runs its thread-sensitive sync code (the request
+signals, MiddlewareMixin middleware) on a thread of its own, and Django
+keeps that thread until the response has been sent. For a stream that is
+open for minutes the thread sits idle all that time.
+
+asgiref has no public API for this, so release() reaches into SyncToAsync.
+SUPPORTED says whether the installed asgiref still looks the way it
+expects; when it does not, release() does nothing and logs once, and
+RequestThreadTests fails so an upgrade cannot break this silently.
+"""
+from collections.abc import MutableMapping
+from contextvars import ContextVar
+import logging
+
+from asgiref.sync import SyncToAsync
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+# Written against asgiref 3.12; SUPPORTED guards the rest
+_context = getattr(SyncToAsync, 'thread_sensitive_context', None)
+_executors = getattr(SyncToAsync, 'context_to_thread_executor', None)
+SUPPORTED = isinstance(_context, ContextVar) and isinstance(_executors, MutableMapping)
+
+_warned = False
+
+
+def _close_connection():
+    connection.close()
+
+
+def release():
+    """
+    Close the request thread's database connection and let the thread exit.
+    A later thread-sensitive call, such as closing the response, starts a
+    short-lived one. Returns whether a thread was released.
+    """
+    global _warned
+    if not SUPPORTED:
+        if not _warned:
+            logger.warning('asgiref internals changed; streams keep their request thread')
+            _warned = True
+        return False
+    context = _context.get(None)
+    # No context outside a request Django's ASGI handler is serving
+    executor = _executors.pop(context, None) if context is not None else None
+    if executor is None:
+        return False
+    # Queued ahead of the shutdown, so it runs on that thread before it exits
+    executor.submit(_close_connection)
+    executor.shutdown(wait=False)
+    return True
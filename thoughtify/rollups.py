@@ -0,0 +1,310 @@
+"""
+Mood rollups: thoughts per (UTC day, emotion tag, sentiment) for the whole
+board, and per (author, week or month, emotion tag, sentiment) for each
+user's timeline.
+
+On SQLite, triggers on thoughtify_thought keep MoodRollup and
+UserMoodRollup in step with every insert, delete and change of created_at,
+author, emotion tag or sentiment. Bulk inserts, the sentiment worker's
+queryset updates and the SET NULL that follows deleting a tag are all
+counted, without Python having to see the rows. Reading a month of moods is
+then a range scan over a few hundred rollup rows, however many thoughts
+there are. Other databases have no triggers, and summary() and timeline()
+aggregate Thought directly there.
+"""
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Count, DateField, Max, Min, Q
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+
+from .models import MoodRollup, Thought, UserMoodRollup
+from .tag_cache import get_emotion_tag
+
+ROLLUP_TABLE = 'thoughtify_moodrollup'
+USER_ROLLUP_TABLE = 'thoughtify_usermoodrollup'
+
+# Label for thoughts without an emotion tag, including those whose tag was deleted
+UNTAGGED = 'Untagged'
+
+# SQL for the start of a thought's period; weeks start on Monday, as in TruncWeek
+PERIOD_STARTS = {
+    'week': "date({row}.created_at, 'weekday 0', '-6 days')",
+    'month': "date({row}.created_at, 'start of month')",
+}
+PERIOD_TRUNCS = {'week': TruncWeek, 'month': TruncMonth}
+
+# Rollup column -> SQL over a thoughtify_thought row ({row} is new or old), per rollup
+BOARD_KEYS = {
+    'day': 'date({row}.created_at)',
+    'emotion_tag_id': '{row}.emotion_tag_id',
+    'sentiment': '{row}.sentiment',
+}
+
+
+def user_keys(period):
+    return {
+        'user_id': '{row}.author_id',
+        'period': f"'{period}'",
+        'starts_on': PERIOD_STARTS[period],
+        'emotion_tag_id': '{row}.emotion_tag_id',
+        'sentiment': '{row}.sentiment',
+    }
+
+
+def _match(keys, row):
+    # IS rather than =: it treats two NULL tags as equal and can still use the index
+    return ' AND '.join(f"{column} IS {sql.format(row=row)}" for column, sql in keys.items())
+
+
+def _add(table, keys, row):
+    values = ', '.join(sql.format(row=row) for sql in keys.values())
+    # Authorless thoughts have no timeline
+    guard = f"{keys['user_id'].format(row=row)} IS NOT NULL AND " if 'user_id' in keys else ''
+    return f"""
+            INSERT INTO {table}({', '.join(keys)}, thoughts)
+                SELECT {values}, 0
+                WHERE {guard}NOT EXISTS (SELECT 1 FROM {table} WHERE {_match(keys, row)});
+            UPDATE {table} SET thoughts = thoughts + 1 WHERE {_match(keys, row)};"""
+
+
+def _remove(table, keys, row):
+    return f"""
+            UPDATE {table} SET thoughts = thoughts - 1 WHERE {_match(keys, row)};
+            DELETE FROM {table} WHERE {_match(keys, row)} AND thoughts <= 0;"""
+
+
+def _triggers(table, key_sets):
+    # Only rewrite the rollups when a row moves to another key
+    columns = dict.fromkeys(sql for keys in key_sets for sql in keys.values() if '{row}' in sql)
+    changed = ' OR '.join(f"{sql.format(row='old')} IS NOT {sql.format(row='new')}" for sql in columns)
+    add = ''.join(_add(table, keys, 'new') for keys in key_sets)
+    remove = ''.join(_remove(table, keys, 'old') for keys in key_sets)
+    return {
+        f'{table}_ai': f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_ai AFTER INSERT ON thoughtify_thought BEGIN{add}
+        END
+    """,
+        f'{table}_ad': f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_ad AFTER DELETE ON thoughtify_thought BEGIN{remove}
+        END
+    """,
+        f'{table}_au': f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_au
+        AFTER UPDATE OF created_at, author_id, emotion_tag_id, sentiment ON thoughtify_thought
+        WHEN {changed}
+        BEGIN{remove}{add}
+        END
+    """,
+    }
+
+
+TRIGGERS = {
+    **_triggers(ROLLUP_TABLE, [BOARD_KEYS]),
+    **_triggers(USER_ROLLUP_TABLE, [user_keys(period) for period in PERIOD_STARTS]),
+}
+
+
+def triggers_available(conn=connection):
+    return conn.vendor == 'sqlite'
+
+
+def install(conn=connection):
+    """
+    Create the rollup triggers if they are missing.
+
+    Like the search triggers, these vanish whenever a migration rebuilds
+    thoughtify_thought, so this runs after every migrate. Returns True when
+    anything was recreated, in which case the rollups should be rebuilt
+    (rebuild() and rebuild_timelines()).
+    """
+    if not triggers_available(conn):
+        return False
+    with conn.cursor() as cursor:
+        names = list(TRIGGERS)
+        cursor.execute(
+            f"SELECT name FROM sqlite_master WHERE type = 'trigger' AND name IN ({', '.join(['%s'] * len(names))})",
+            names,
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        missing = [name for name in TRIGGERS if name not in existing]
+        for name in missing:
+            cursor.execute(TRIGGERS[name])
+    return bool(missing)
+
+
+def thought_days(start, end):
+    """Counts per (day, emotion_tag_id, sentiment) for days in [start, end), straight from Thought"""
+    # UTC days, the same ones SQLite's date() gives the triggers, as a
+    # created_at range so the index is used
+    return (Thought.objects.filter(created_at__gte=utc_midnight(start), created_at__lt=utc_midnight(end))
+            .annotate(day=TruncDate('created_at', tzinfo=dt_timezone.utc))
+            .values('day', 'emotion_tag_id', 'sentiment').annotate(thoughts=Count('id')).order_by())
+
+
+def utc_midnight(day):
+    return datetime.combine(day, time.min, tzinfo=dt_timezone.utc)
+
+
+def rebuild(chunk_days=30, progress=None, conn=connection):
+    """
+    Recompute every rollup row from Thought, ``chunk_days`` days per transaction.
+
+    Each chunk deletes and recounts its own days while holding the write
+    lock, so thoughts written during a rebuild are neither lost nor counted
+    twice. ``progress`` is called with (first day, last day, rows) per chunk;
+    returns the rows written.
+    """
+    using = conn.alias
+    rollups = MoodRollup.objects.using(using)
+    bounds = [
+        Thought.objects.using(using).aggregate(first=Min('created_at'), last=Max('created_at')),
+        rollups.aggregate(first=Min('day'), last=Max('day')),
+    ]
+    days = [value.astimezone(dt_timezone.utc).date() if isinstance(value, datetime) else value
+            for bound in bounds for value in bound.values() if value is not None]
+    if not days:
+        return 0
+    start, last = min(days), max(days)
+    total = 0
+    while start <= last:
+        end = start + timedelta(days=chunk_days)
+        with transaction.atomic(using=using):
+            # Delete first: the write lock is taken before Thought is read
+            rollups.filter(day__gte=start, day__lt=end).delete()
+            rows = [MoodRollup(**row) for row in thought_days(start, end).using(using)]
+            rollups.bulk_create(rows, batch_size=500)
+        total += len(rows)
+        if progress:
+            progress(start, end - timedelta(days=1), len(rows))
+        start = end
+    return total
+
+
+def summary(start, end):
+    """
+    Moods between ``start`` and ``end`` (dates, inclusive) as plain data.
+
+    {'days': [{'date', 'total', 'emotion_tags': {tag: n}, 'sentiments': {sentiment: n}}],
+     'emotion_tags': {tag: n}, 'sentiments': {sentiment: n}, 'total': n}
+    """
+    if triggers_available():
+        rows = (MoodRollup.objects.filter(day__gte=start, day__lte=end)
+                .values('day', 'emotion_tag_id', 'sentiment', 'thoughts').order_by('day'))
+    else:
+        rows = thought_days(start, end + timedelta(days=1)).order_by('day')
+    by_day = {}
+    emotion_tags = {}
+    sentiments = {}
+    for row in rows:
+        day = by_day.setdefault(row['day'], {
+            'date': row['day'].isoformat(), 'total': 0, 'emotion_tags': {}, 'sentiments': {},
+        })
+        count = row['thoughts']
+        day['total'] += count
+        tag = tag_name(row['emotion_tag_id'])
+        for totals in (day['emotion_tags'], emotion_tags):
+            totals[tag] = totals.get(tag, 0) + count
+        for totals in (day['sentiments'], sentiments):
+            totals[row['sentiment']] = totals.get(row['sentiment'], 0) + count
+    return {
+        'days': list(by_day.values()),
+        'emotion_tags': emotion_tags,
+        'sentiments': sentiments,
+        'total': sum(sentiments.values()),
+    }
+
+
+def tag_name(tag_id):
+    tag = get_emotion_tag(tag_id) if tag_id is not None else None
+    return tag.name if tag else UNTAGGED
+
+
+def user_periods(user_ids, using=None):
+    """Counts per (author, period, start, emotion_tag_id, sentiment) for these users, straight from Thought"""
+    thoughts = Thought.objects.using(using).filter(author_id__in=user_ids)
+    for period, trunc in PERIOD_TRUNCS.items():
+        starts = trunc('created_at', output_field=DateField(), tzinfo=dt_timezone.utc)
+        rows = (thoughts.annotate(starts_on=starts)
+                .values('author_id', 'starts_on', 'emotion_tag_id', 'sentiment')
+                .annotate(thoughts=Count('id')).order_by())
+        for row in rows:
+            yield UserMoodRollup(user_id=row.pop('author_id'), period=period, **row)
+
+
+def rebuild_timelines(batch_size=500, progress=None, conn=connection):
+    """
+    Recompute every user's timeline rollups, ``batch_size`` users per transaction.
+
+    As in rebuild(), each batch deletes its rows before reading Thought, so
+    the batch is recounted under the write lock. ``progress`` is called with
+    (users so far, rows written); returns the rows written.
+    """
+    using = conn.alias
+    rollups = UserMoodRollup.objects.using(using)
+    last_id = 0
+    users = 0
+    total = 0
+    while True:
+        user_ids = list(User.objects.using(using).filter(id__gt=last_id).order_by('id')
+                        .values_list('id', flat=True)[:batch_size])
+        if not user_ids:
+            return total
+        last_id = user_ids[-1]
+        with transaction.atomic(using=using):
+            rollups.filter(user_id__in=user_ids).delete()
+            rows = rollups.bulk_create(user_periods(user_ids, using), batch_size=500)
+        users += len(user_ids)
+        total += len(rows)
+        if progress:
+            progress(users, total)
+
+
+def timeline_queryset(user, today, weeks, months):
+    """Rollup rows for the last ``weeks`` weeks and ``months`` months, newest first"""
+    first_week = today - timedelta(days=today.weekday() + 7 * (weeks - 1))
+    first_month = month_start(today, months - 1)
+    if not triggers_available():
+        return [row for row in user_periods([user.pk])
+                if row.starts_on >= (first_week if row.period == 'week' else first_month)]
+    return (UserMoodRollup.objects.filter(user=user)
+            .filter(Q(period='week', starts_on__gte=first_week) | Q(period='month', starts_on__gte=first_month))
+            .order_by('-starts_on'))
+
+
+def month_start(day, months_back=0):
+    month = day.year * 12 + day.month - 1 - months_back
+    return date(month // 12, month % 12 + 1, 1)
+
+
+def timeline(rows):
+    """
+    Fold timeline rollup rows into {'week': [...], 'month': [...]}, newest first.
+
+    Each period is {'starts_on', 'total', 'emotion_tags': [(tag, n)] busiest
+    first, 'sentiments': [(sentiment, label, n, percent)] in SENTIMENT_CHOICES order}.
+    """
+    periods = {'week': {}, 'month': {}}
+    for row in sorted(rows, key=lambda row: row.starts_on, reverse=True):
+        entry = periods[row.period].setdefault(row.starts_on, {'total': 0, 'emotion_tags': {}, 'sentiments': {}})
+        entry['total'] += row.thoughts
+        tag = tag_name(row.emotion_tag_id)
+        entry['emotion_tags'][tag] = entry['emotion_tags'].get(tag, 0) + row.thoughts
+        entry['sentiments'][row.sentiment] = entry['sentiments'].get(row.sentiment, 0) + row.thoughts
+    return {
+        period: [
+            {
+                'starts_on': starts_on,
+                'total': entry['total'],
+                'emotion_tags': sorted(entry['emotion_tags'].items(), key=lambda item: -item[1]),
+                'sentiments': [
+                    (value, label, entry['sentiments'].get(value, 0),
+                     round(100 * entry['sentiments'].get(value, 0) / entry['total']))
+                    for value, label in Thought.SENTIMENT_CHOICES
+                ],
+            }
+            for starts_on, entry in entries.items()
+        ]
+        for period, entries in periods.items()
+    }
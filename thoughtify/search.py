@@ -0,0 +1,138 @@
+"""
+Full-text search over Thought.content.
+
+On SQLite the text lives in an external-content FTS5 table that triggers keep
+in step with thoughtify_thought, so bulk inserts and queryset updates are
+indexed too. Other databases fall back to a plain icontains filter.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .pagination import KeysetPage, KeysetPaginator, pack_cursor, unpack_cursor
+
+FTS_TABLE = 'thoughtify_thought_fts'
+
+TRIGGERS = {
+    f'{FTS_TABLE}_ai': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON thoughtify_thought BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, content) VALUES (new.id, new.content);
+        END
+    """,
+    f'{FTS_TABLE}_ad': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON thoughtify_thought BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content) VALUES ('delete', old.id, old.content);
+        END
+    """,
+    f'{FTS_TABLE}_au': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF content ON thoughtify_thought BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content) VALUES ('delete', old.id, old.content);
+            INSERT INTO {FTS_TABLE}(rowid, content) VALUES (new.id, new.content);
+        END
+    """,
+}
+
+
+def fts_available(conn=connection):
+    return conn.vendor == 'sqlite'
+
+
+def install(conn=connection):
+    """
+    Create the FTS table and its triggers if they are missing.
+
+    Django rebuilds SQLite tables for many schema changes, which drops their
+    triggers, so this runs after every migrate. Returns True when anything had
+    to be recreated, in which case the index should be rebuilt.
+    """
+    if not fts_available(conn):
+        return False
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE name = %s OR (type = 'trigger' AND name LIKE %s)",
+            [FTS_TABLE, f'{FTS_TABLE}_%'],
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        missing = [name for name in [FTS_TABLE, *TRIGGERS] if name not in existing]
+        if not missing:
+            return False
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            "content, content='thoughtify_thought', content_rowid='id', tokenize='porter unicode61')"
+        )
+        for sql in TRIGGERS.values():
+            cursor.execute(sql)
+    return True
+
+
+def rebuild(conn=connection):
+    """Re-read every thought into the FTS index"""
+    if not fts_available(conn):
+        return
+    with conn.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+
+
+def match_query(text):
+    """Turn free text into an FTS5 query that ANDs quoted terms, so user input can't inject syntax"""
+    terms = re.findall(r'\w+', text)
+    return ' '.join('"%s"' % term for term in terms)
+
+
+def content_filter(text):
+    """Q object matching thoughts whose content contains ``text``"""
+    query = match_query(text)
+    if not query:
+        return Q(pk__in=[])
+    if not fts_available():
+        return Q(content__icontains=text)
+    return Q(pk__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [query]))
+
+
+def search_thoughts(queryset, text, cursor=None, per_page=20):
+    """
+    Best matches first, paged on (rank, id) so later pages seek instead of OFFSET.
+
+    ``queryset`` carries any visibility filters; only its matching ids are
+    ranked, and the page is then loaded through it to keep select_related.
+    """
+    query = match_query(text)
+    if not query:
+        return KeysetPage([], False, None)
+    if not fts_available():
+        # Without FTS there is no rank; newest first is the next best order
+        return KeysetPaginator(queryset.filter(content__icontains=text), per_page).get_page(cursor)
+
+    position = unpack_cursor(cursor, 2)
+    # Restricting the candidates to FTS hits first keeps the visibility filter
+    # proportional to the number of matches rather than the table size
+    candidates = queryset.filter(content_filter(text)).order_by().values('id')
+    ids_sql, ids_params = candidates.query.sql_with_params()
+    sql = (
+        f"SELECT rowid, rank FROM {FTS_TABLE} "
+        f"WHERE {FTS_TABLE} MATCH %s AND rowid IN ({ids_sql})"
+    )
+    params = [query, *ids_params]
+    if position is not None:
+        try:
+            rank, pk = float(position[0]), int(position[1])
+        except ValueError:
+            rank = pk = None
+        if pk is not None:
+            sql += " AND (rank > %s OR (rank = %s AND rowid > %s))"
+            params += [rank, rank, pk]
+    sql += " ORDER BY rank, rowid LIMIT %s"
+    params.append(per_page + 1)
+
+    with connection.cursor() as db_cursor:
+        db_cursor.execute(sql, params)
+        hits = db_cursor.fetchall()
+    has_next = len(hits) > per_page
+    hits = hits[:per_page]
+    by_id = queryset.in_bulk([pk for pk, _ in hits])
+    thoughts = [by_id[pk] for pk, _ in hits if pk in by_id]
+    next_cursor = pack_cursor(repr(hits[-1][1]), hits[-1][0]) if has_next else None
+    return KeysetPage(thoughts, has_next, next_cursor)
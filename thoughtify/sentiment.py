@@ -0,0 +1,41 @@
+"""
+Sentiment scoring for thoughts.
+
+Kept free of Django imports so process-pool workers can load it without
+setting Django up. TextBlob is imported on first use, never by the web process
+on the request path.
+"""
+from .services import LazyService
+
+# Polarity beyond these bounds counts as positive / negative
+POSITIVE_THRESHOLD = 0.1
+NEGATIVE_THRESHOLD = -0.1
+
+
+def _load_textblob():
+    from textblob import TextBlob
+    # The lexicon is read on the first call; do it here rather than mid-batch
+    TextBlob('warm up').sentiment
+    return TextBlob
+
+
+_analyzer = LazyService(_load_textblob)
+
+
+def load():
+    """Import and warm up the analyzer once per process"""
+    return _analyzer.get()
+
+
+def label_for(polarity):
+    if polarity > POSITIVE_THRESHOLD:
+        return 'positive'
+    if polarity < NEGATIVE_THRESHOLD:
+        return 'negative'
+    return 'neutral'
+
+
+def score_texts(texts):
+    """Return a sentiment label for each text"""
+    analyzer = load()
+    return [label_for(analyzer(text).sentiment.polarity) for text in texts]
@@ -0,0 +1,29 @@
+"""
+Lazily initialized wrappers for heavy optional dependencies.
+
+Web workers import this module for free; the wrapped library is only
+imported the first time a caller actually asks for it.
+"""
+import threading
+
+# Modules the web process must never import at startup
+HEAVY_MODULES = ('textblob', 'nltk', 'joblib', 'regex', 'better_profanity')
+
+
+class LazyService:
+    def __init__(self, loader):
+        self._loader = loader
+        self._instance = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._instance is not None
+
+    def get(self):
+        if self._instance is None:
+            with self._lock:
+                # Another thread may have finished loading while we waited
+                if self._instance is None:
+                    self._instance = self._loader()
+        return self._instance
@@ -0,0 +1,29 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import live, metrics, tag_cache
+from .models import EmotionTag, Like, Thought
+
+
+@receiver(post_save, sender=EmotionTag)
+@receiver(post_delete, sender=EmotionTag)
+def emotion_tags_changed(sender, **kwargs):
+    tag_cache.invalidate()
+    # Bump again after commit: another process may have reloaded the old rows in between
+    transaction.on_commit(tag_cache.invalidate)
+
+
+@receiver(post_save, sender=Thought)
+def thought_created(sender, instance, created, **kwargs):
+    if created:
+        metrics.inc('thoughtify_thoughts_created_total')
+        if instance.is_public and live.thoughts:
+            # Push the card only once it is visible to other connections
+            transaction.on_commit(lambda: live.publish_thought(instance.pk))
+
+
+@receiver(post_save, sender=Like)
+def like_created(sender, created, **kwargs):
+    if created:
+        metrics.inc('thoughtify_likes_created_total')
@@ -0,0 +1,73 @@
+"""
+Process-wide cache of the EmotionTag table.
+
+Tags change only through the admin, so every process keeps the full list in
+memory. Saving or deleting a tag bumps a version number in the Django cache;
+each process compares it on access and reloads when it has moved, so other
+workers catch up as soon as they share that cache.
+"""
+import threading
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+VERSION_KEY = 'thoughtify:emotion_tags:version'
+
+_lock = threading.Lock()
+_state = {'version': None, 'tags': None, 'by_id': None, 'choices': None}
+
+
+def _current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = 1
+        cache.add(VERSION_KEY, version, None)
+    return version
+
+
+def _load():
+    from .models import EmotionTag
+    version = _current_version()
+    if _state['tags'] is not None and _state['version'] == version:
+        return _state
+    with _lock:
+        if _state['tags'] is None or _state['version'] != version:
+            tags = tuple(EmotionTag.objects.order_by('id'))
+            _state.update(
+                version=version,
+                tags=tags,
+                by_id={tag.id: tag for tag in tags},
+                choices=tuple((tag.id, tag.name) for tag in tags),
+            )
+    return _state
+
+
+def get_emotion_tags():
+    return _load()['tags']
+
+
+async def aget_emotion_tags():
+    """get_emotion_tags for async views, in a thread: even a hit reads the version from the shared cache"""
+    return await sync_to_async(get_emotion_tags)()
+
+
+def get_emotion_tag(pk):
+    """The cached tag with this primary key, or None"""
+    return _load()['by_id'].get(pk)
+
+
+def get_emotion_tag_choices(empty_label=None):
+    choices = _load()['choices']
+    if empty_label is not None:
+        return (('', empty_label),) + choices
+    return choices
+
+
+def invalidate(**kwargs):
+    """Signal receiver: drop this process's copy and tell the others to reload"""
+    with _lock:
+        _state['tags'] = None
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, None)
@@ -0,0 +1,28 @@
+"""
+Django template backend that reports render time to thoughtify.metrics.
+
+Only templates loaded through the backend (render(), get_template()) are
+timed; {% include %}s render inside them, so nothing is counted twice.
+"""
+import time
+
+from django.template.backends.django import DjangoTemplates, Template
+
+from . import metrics
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.add_template_time(time.perf_counter() - start)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
@@ -0,0 +1,33 @@
+"""Test runner that keeps the suite's on-disk state out of the project directory"""
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class ThoughtifyTestRunner(DiscoverRunner):
+    """
+    Points the SQLite cache and METRICS_DIR into a scratch directory for the
+    run, the way the test database replaces db.sqlite3, and removes it afterwards.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.scratch_dir = tempfile.mkdtemp(prefix='thoughtify-test-')
+        caches = {alias: dict(config) for alias, config in settings.CACHES.items()}
+        for alias, config in caches.items():
+            # Aliases such as template_fragments name another cache, not a file
+            if config['BACKEND'] == 'thoughtify.cache_backends.SQLiteCache':
+                config['LOCATION'] = os.path.join(self.scratch_dir, f'{alias}-cache.sqlite3')
+        self.scratch_settings = override_settings(
+            CACHES=caches, METRICS_DIR=os.path.join(self.scratch_dir, 'metrics'),
+        )
+        self.scratch_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.scratch_settings.disable()
+        shutil.rmtree(self.scratch_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
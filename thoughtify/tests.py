@@ -1,3 +1,1102 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from importlib import import_module, reload
+from unittest import mock
+import asyncio
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.management import call_command
+from django.core.signals import setting_changed
+from django.db import connection
+from django.db.models import QuerySet
+from django.core.handlers.asgi import ASGIHandler
+from django.test import AsyncClient, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.dispatch import receiver
+from django.urls import clear_url_caches, resolve, reverse
+from django.utils import timezone
+
+from .models import (
+    AnonymousCode, DraftThought, EmotionTag, Like, MoodRollup, Thought, TrendingEpoch, UserMoodRollup, UserProfile,
+)
+from .cache_backends import CULL_CHECK_INTERVAL, SQLiteCache
+from .db import sqlite_pragmas
+from .pagination import KeysetPaginator, decode_cursor, encode_cursor
+from .search import FTS_TABLE, search_thoughts
+from .services import LazyService
+from . import live, metrics, request_threads, rollups, trending
+from . import tag_cache, views
+from .forms import ThoughtForm
+from .views import feed_filters, feed_queryset
+
+
+def make_user(username='alice@example.com', code='A001'):
+    user = User.objects.create_user(username=username, password='pass12345!')
+    UserProfile.objects.create(user=user, anonymous_code=code)
+    AnonymousCode.objects.filter(code=code).update(claimed=True)
+    return user
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        now = timezone.now()
+        # Two thoughts share a timestamp so the id tie-break is exercised
+        self.thoughts = [
+            Thought.objects.create(author=self.user, content=f'thought {i}',
+                                   created_at=now - timedelta(minutes=i // 2))
+            for i in range(5)
+        ]
+
+    def test_cursor_round_trip(self):
+        thought = self.thoughts[0]
+        self.assertEqual(decode_cursor(encode_cursor(thought.created_at, thought.pk)),
+                         (thought.created_at, thought.pk))
+        self.assertIsNone(decode_cursor('not-a-cursor'))
+
+    def test_pages_cover_every_row_once(self):
+        paginator = KeysetPaginator(Thought.objects.all(), 2)
+        seen, cursor = [], None
+        while True:
+            page = paginator.get_page(cursor)
+            seen.extend(t.pk for t in page)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        expected = Thought.objects.order_by('-created_at', '-id').values_list('pk', flat=True)
+        self.assertEqual(seen, list(expected))
+
+    def test_feed_partial_links_next_cursor(self):
+        self.client.force_login(self.user)
+        for i in range(20):
+            Thought.objects.create(author=self.user, content=f'extra {i}')
+        response = self.client.get(reverse('feed'), HTTP_HX_REQUEST='true')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '?cursor=')
+
+
+class LikeCounterTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.thought = Thought.objects.create(author=self.user, content='hello')
+        self.client.force_login(self.user)
+
+    def test_like_toggle_updates_counter(self):
+        url = reverse('like_thought', args=[self.thought.id])
+        self.client.post(url)
+        self.thought.refresh_from_db()
+        self.assertEqual(self.thought.likes_count, 1)
+        self.client.post(url)
+        self.thought.refresh_from_db()
+        self.assertEqual(self.thought.likes_count, 0)
+
+    def test_sync_like_counts_repairs_drift(self):
+        Like.objects.create(user=self.user, thought=self.thought)
+        Thought.objects.filter(pk=self.thought.pk).update(likes_count=7)
+        call_command('sync_like_counts', batch_size=1, stdout=StringIO())
+        self.thought.refresh_from_db()
+        self.assertEqual(self.thought.likes_count, 1)
+
+    def test_htmx_like_returns_button_fragment(self):
+        url = reverse('like_thought', args=[self.thought.id])
+        response = self.client.post(url, HTTP_HX_REQUEST='true')
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'thoughtify/partials/like_button.html')
+        self.assertContains(response, f'id="like-{self.thought.id}"')
+        self.assertTrue(response.context['liked'])
+
+    def test_like_missing_thought_is_404(self):
+        response = self.client.post(reverse('like_thought', args=[9999]))
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(Like.objects.exists())
+
+
+class LikedStateTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # Tags are cached on first use; warm them so both requests count the same queries
+        tag_cache.get_emotion_tags()
+        self.user = make_user()
+        self.client.force_login(self.user)
+
+    def feed_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('feed'))
+        return response, len(ctx.captured_queries)
+
+    def test_liked_lookup_is_one_query_per_page(self):
+        first = Thought.objects.create(author=self.user, content='first')
+        Like.objects.create(user=self.user, thought=first)
+        _, baseline = self.feed_queries()
+        for i in range(5):
+            thought = Thought.objects.create(author=self.user, content=f'more {i}')
+            Like.objects.create(user=self.user, thought=thought)
+        response, queries = self.feed_queries()
+        self.assertEqual(queries, baseline)
+        self.assertContains(response, 'aria-pressed="true"', count=6)
+        self.assertNotContains(response, 'aria-pressed="false"')
+
+
+class AnonymousCodeTests(TestCase):
+    def test_claim_skips_codes_in_use(self):
+        make_user('zed@example.com', code='Z001')
+        codes = {UserProfile.generate_anonymous_code('zoe@example.com') for _ in range(20)}
+        self.assertEqual(len(codes), 20)
+        self.assertNotIn('Z001', codes)
+        self.assertTrue(all(len(code) == 4 and code[0] == 'Z' for code in codes))
+
+    def test_exhausted_pool_falls_back_to_wider_codes(self):
+        AnonymousCode.objects.filter(prefix='Q', width=3).update(claimed=True)
+        self.assertEqual(len(AnonymousCode.claim('Q')), 5)
+        AnonymousCode.objects.filter(prefix='Q').update(claimed=True)
+        # The five digit pool is not seeded by migrations; the first claim that needs it seeds it
+        self.assertFalse(AnonymousCode.objects.filter(prefix='Q', width=5).exists())
+        self.assertEqual(len(AnonymousCode.claim('Q')), 6)
+
+    def test_seed_command_opens_next_width_ahead_of_signups(self):
+        AnonymousCode.objects.filter(prefix='J').update(claimed=True)
+        call_command('seed_anonymous_codes', prefixes=['J'], stdout=StringIO())
+        self.assertEqual(AnonymousCode.objects.filter(prefix='J', width=5, claimed=False).count(), 99999)
+
+    def test_signup_with_non_alphanumeric_email(self):
+        response = self.client.post(reverse('signup'), {
+            'username': '_bob@example.com', 'password1': 'Str0ng-pass!', 'password2': 'Str0ng-pass!',
+        })
+        self.assertEqual(response.status_code, 302)
+        code = UserProfile.objects.get(user__username='_bob@example.com').anonymous_code
+        self.assertRegex(code, r'^X\d{3}$')
+
+    def test_claim_retries_until_width_is_empty(self):
+        pool = AnonymousCode.objects.filter(prefix='R', width=3)
+        pool.exclude(id__in=pool.order_by('id').values('id')[:8]).update(claimed=True)
+        real_update = QuerySet.update
+        lost = []
+
+        def racing_update(queryset, **kwargs):
+            rows = real_update(queryset, **kwargs)
+            if len(lost) < 6:
+                # Another signup flipped the row first
+                lost.append(rows)
+                return 0
+            return rows
+
+        with mock.patch.object(QuerySet, 'update', racing_update), self.assertLogs('thoughtify.models', 'WARNING'):
+            code = AnonymousCode.claim('R')
+        self.assertEqual(len(lost), 6)
+        self.assertEqual(len(code), 4)
+
+    def test_low_pool_is_reported(self):
+        AnonymousCode.objects.filter(prefix='K').exclude(
+            id__in=AnonymousCode.objects.filter(prefix='K').order_by('-id').values('id')[:50]
+        ).update(claimed=True)
+        with self.assertLogs('thoughtify.models', 'WARNING'):
+            AnonymousCode.claim('K')
+
+    def test_create_user_profiles_backfills_in_batches(self):
+        make_user('amy@example.com', code='A001')
+        for i in range(5):
+            User.objects.create_user(username=f'ann{i}@example.com', password='x')
+        call_command('create_user_profiles', batch_size=2, stdout=StringIO())
+        self.assertFalse(User.objects.filter(userprofile__isnull=True).exists())
+        codes = list(UserProfile.objects.values_list('anonymous_code', flat=True))
+        self.assertEqual(len(codes), len(set(codes)))
+        self.assertEqual(AnonymousCode.objects.filter(prefix='A', claimed=True).count(), 6)
+
+    def test_create_user_profiles_seed_is_reproducible(self):
+        runs = []
+        for _ in range(2):
+            for i in range(3):
+                User.objects.create_user(username=f'ben{i}@example.com', password='x')
+            call_command('create_user_profiles', seed=7, stdout=StringIO())
+            runs.append(list(UserProfile.objects.order_by('user__username').values_list('anonymous_code', flat=True)))
+            User.objects.all().delete()
+            AnonymousCode.objects.update(claimed=False)
+        self.assertEqual(runs[0], runs[1])
+
+
+class LoadDataTests(TestCase):
+    def test_generate_load_data_is_consistent(self):
+        call_command('generate_load_data', users=20, thoughts=200, likes=500,
+                     batch_size=64, stdout=StringIO())
+        self.assertEqual(User.objects.filter(userprofile__isnull=True).count(), 0)
+        self.assertEqual(Thought.objects.count(), 200)
+        total = sum(Thought.objects.values_list('likes_count', flat=True))
+        self.assertEqual(total, Like.objects.count())
+
+
+class SentimentPipelineTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.happy = Thought.objects.create(author=self.user, content='I love this wonderful day')
+        self.sad = Thought.objects.create(author=self.user, content='This is a terrible, awful day')
+
+    def test_worker_drains_queue(self):
+        call_command('sentiment_worker', once=True, stdout=StringIO())
+        self.happy.refresh_from_db()
+        self.sad.refresh_from_db()
+        self.assertEqual(self.happy.sentiment, 'positive')
+        self.assertEqual(self.sad.sentiment, 'negative')
+        self.assertEqual(Thought.pending_sentiment(10), [])
+
+    def test_edit_requeues_thought(self):
+        call_command('sentiment_worker', once=True, stdout=StringIO())
+        tag = EmotionTag.objects.create(name='Sad')
+        self.client.force_login(self.user)
+        self.client.post(reverse('update_thought', args=[self.happy.id]),
+                         {'content': 'A terrible loss', 'emotion_tag': tag.id, 'is_public': 'on'})
+        self.assertEqual([row[0] for row in Thought.pending_sentiment(10)], [self.happy.id])
+
+    def test_stale_score_is_discarded(self):
+        rows = Thought.pending_sentiment(10)
+        Thought.objects.get(pk=self.happy.pk).save()
+        self.assertEqual(Thought.save_sentiments(rows, ['negative', 'negative']), 1)
+
+    def test_backfill_uses_process_pool(self):
+        call_command('backfill_sentiment', workers=2, batch_size=1, stdout=StringIO())
+        self.assertEqual(Thought.pending_sentiment(10), [])
+        self.assertEqual(Thought.objects.get(pk=self.sad.pk).sentiment, 'negative')
+
+
+class StartupTests(TestCase):
+    def test_lazy_service_loads_once(self):
+        calls = []
+        service = LazyService(lambda: calls.append(1) or object())
+        self.assertFalse(service.loaded)
+        self.assertIs(service.get(), service.get())
+        self.assertEqual(calls, [1])
+
+    def test_web_startup_skips_heavy_modules(self):
+        out = StringIO()
+        call_command('bench_startup', repeat=1, stdout=out)
+        self.assertIn('No heavy NLP modules loaded', out.getvalue())
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.client.force_login(self.user)
+        self.garden = Thought.objects.create(author=self.user, content='Walking in the garden with friends')
+        self.rain = Thought.objects.create(author=self.user, content='Rainy garden, rainy garden, rainy day')
+        self.private = Thought.objects.create(author=self.user, content='My secret garden', is_public=False)
+
+    def test_index_follows_edits_and_deletes(self):
+        public = Thought.objects.filter(is_public=True)
+        self.assertEqual({t.id for t in search_thoughts(public, 'garden')},
+                         {self.garden.id, self.rain.id})
+        self.garden.content = 'Walking by the sea'
+        self.garden.save()
+        self.rain.delete()
+        self.assertEqual(list(search_thoughts(public, 'garden')), [])
+        self.assertEqual([t.id for t in search_thoughts(public, 'sea')], [self.garden.id])
+
+    def test_ranked_keyset_pages(self):
+        public = Thought.objects.filter(is_public=True)
+        first = search_thoughts(public, 'garden', per_page=1)
+        self.assertEqual([t.id for t in first], [self.rain.id])
+        second = search_thoughts(public, 'garden', first.next_cursor, per_page=1)
+        self.assertEqual([t.id for t in second], [self.garden.id])
+        self.assertFalse(second.has_next)
+
+    def test_search_view_hides_private_and_escapes_syntax(self):
+        response = self.client.get(reverse('search'), {'q': '"garden*'})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'My secret garden')
+        self.assertContains(response, 'Rainy garden')
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')")
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(search_thoughts(Thought.objects.all(), 'garden')), 3)
+
+
+class FeedQueryPlanTests(TestCase):
+    """Every feed variant must be an ordered index range: no table scan, no sort"""
+
+    VARIANTS = [
+        {},
+        {'tag': '1'},
+        {'sentiment': 'positive'},
+        {'daily': '1'},
+        {'tag': '1', 'sentiment': 'negative'},
+        {'tag': '1', 'daily': '1'},
+    ]
+
+    def setUp(self):
+        self.user = make_user()
+        tag = EmotionTag.objects.create(name='Happy')
+        for i in range(30):
+            Thought.objects.create(author=self.user, content=f'plan {i}', emotion_tag=tag,
+                                   sentiment='positive' if i % 2 else 'negative',
+                                   is_daily_thought=i % 5 == 0)
+        self.cursor = KeysetPaginator(Thought.objects.all(), 5).get_page().next_cursor
+
+    def assert_indexed(self, queryset):
+        plan = queryset.explain()
+        self.assertNotIn('TEMP B-TREE', plan)
+        # An ordered walk of a feed index stops at LIMIT; a table scan does not
+        self.assertNotRegex(plan, r'SCAN thoughtify_thought(?! USING INDEX)')
+        self.assertRegex(plan, r'thoughtify_thought USING INDEX thought_public_')
+
+    def test_feed_variants_use_composite_indexes(self):
+        for params in self.VARIANTS:
+            for cursor in (None, self.cursor):
+                with self.subTest(params=params, cursor=cursor):
+                    paginator = KeysetPaginator(feed_queryset(feed_filters(params)), 20)
+                    self.assert_indexed(paginator.page_queryset(cursor))
+
+    def test_filtered_feed_view(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('feed'), {'sentiment': 'positive', 'daily': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(all(t.sentiment == 'positive' and t.is_daily_thought
+                            for t in response.context['thoughts']))
+
+
+class TagCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = make_user()
+        self.client.force_login(self.user)
+        self.happy = EmotionTag.objects.create(name='Happy')
+
+    def test_form_renders_without_queries(self):
+        tag_cache.get_emotion_tags()
+        with self.assertNumQueries(0):
+            html = ThoughtForm().as_p()
+        self.assertIn('Happy', html)
+        form = ThoughtForm({'content': 'hi', 'emotion_tag': str(self.happy.id), 'is_public': 'on'})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data['emotion_tag'], self.happy)
+
+    def test_rename_invalidates_cache(self):
+        tag_cache.get_emotion_tags()
+        self.happy.name = 'Joyful'
+        self.happy.save()
+        self.assertEqual([tag.name for tag in tag_cache.get_emotion_tags()], ['Joyful'])
+        self.assertFalse(ThoughtForm({'content': 'hi', 'emotion_tag': '999'}).is_valid())
+
+    def test_defining_a_form_runs_no_queries(self):
+        # Forms are built at import, which under ASGI happens inside the event loop
+        tag_cache.invalidate()
+        with self.assertNumQueries(0):
+            type('AnotherThoughtForm', (ThoughtForm,), {})
+
+
+class CardCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = make_user()
+        self.other = make_user('bob@example.com', code='B001')
+        self.thought = Thought.objects.create(author=self.user, content='cached card')
+
+    def card_key(self, thought):
+        return make_template_fragment_key('thought_card_compact', [
+            thought.id, thought.updated_at.isoformat(), thought.sentiment, '',
+        ])
+
+    def test_card_is_shared_but_like_state_is_not(self):
+        Like.objects.create(user=self.user, thought=self.thought)
+        self.client.force_login(self.user)
+        owner = self.client.get(reverse('feed'))
+        self.assertIsNotNone(cache.get(self.card_key(self.thought)))
+        self.assertContains(owner, 'aria-pressed="true"')
+        self.client.force_login(self.other)
+        viewer = self.client.get(reverse('feed'))
+        self.assertContains(viewer, 'cached card')
+        self.assertContains(viewer, 'aria-pressed="false"')
+
+    def test_sentiment_change_misses_cache(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('my_thoughts'))
+        Thought.objects.filter(pk=self.thought.pk).update(sentiment='positive', content='rescored')
+        response = self.client.get(reverse('my_thoughts'))
+        self.assertContains(response, 'rescored')
+
+
+def _incr_many(path):
+    cache = SQLiteCache(path, {})
+    for _ in range(200):
+        cache.incr('hits')
+
+
+class SQLiteCacheTests(TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.workdir, 'cache.sqlite3')
+        self.cache = SQLiteCache(self.path, {'OPTIONS': {'MAX_ENTRIES': 50, 'CULL_FREQUENCY': 2}})
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def test_round_trip_and_expiry(self):
+        self.cache.set('card', {'html': '<p>hi</p>'}, 60)
+        self.cache.set('flag', True)
+        self.assertEqual(self.cache.get('card'), {'html': '<p>hi</p>'})
+        self.assertIs(self.cache.get('flag'), True)
+        self.cache.set('gone', 'x', -1)
+        self.assertIsNone(self.cache.get('gone'))
+        self.assertTrue(self.cache.add('gone', 'back'))
+        self.assertFalse(self.cache.add('gone', 'again'))
+
+    def test_size_cap(self):
+        for i in range(CULL_CHECK_INTERVAL):
+            self.cache.set(f'key{i}', i)
+        count = self.cache._connection().execute('SELECT COUNT(*) FROM cache_entries').fetchone()[0]
+        self.assertLessEqual(count, 50)
+
+    def test_incr_is_atomic_across_processes(self):
+        self.cache.set('hits', 0)
+        processes = [multiprocessing.get_context('fork').Process(target=_incr_many, args=(self.path,))
+                     for _ in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        self.assertEqual(self.cache.get('hits'), 800)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_suite_does_not_share_the_project_cache(self):
+        self.assertNotEqual(os.path.dirname(cache._path), str(settings.BASE_DIR))
+
+
+class SQLiteProfileTests(TestCase):
+    def test_pragmas_applied_on_connect(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -64000)
+
+    @override_settings(SQLITE_PRAGMAS={'cache_size': -2000})
+    def test_settings_override_single_pragmas(self):
+        pragmas = sqlite_pragmas()
+        self.assertEqual(pragmas['cache_size'], -2000)
+        self.assertEqual(pragmas['journal_mode'], 'WAL')
+
+    def test_toggle_returns_state_and_count(self):
+        user = make_user()
+        thought = Thought.objects.create(author=user, content='hello')
+        self.assertEqual(Like.toggle(user, thought.id), (True, 1))
+        self.assertEqual(Like.toggle(user, thought.id), (False, 0))
+        with self.assertRaises(Thought.DoesNotExist):
+            Like.toggle(user, 9999)
+
+
+class DbMaintenanceTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_reports_each_step(self):
+        out = StringIO()
+        call_command('db_maintenance', stdout=out)
+        output = out.getvalue()
+        for label in ('Integrity check: quick_check ok', 'Vacuum:', 'Statistics:', 'WAL checkpoint:'):
+            self.assertIn(label, output)
+        self.assertIn('Maintenance finished', output)
+        self.assertIsNone(cache.get('db_maintenance:running'))
+
+    def test_overlapping_run_is_skipped(self):
+        cache.set('db_maintenance:running', 1)
+        out = StringIO()
+        call_command('db_maintenance', stdout=out)
+        self.assertIn('in progress', out.getvalue())
+        cache.delete('db_maintenance:running')
+
+
+class DraftThoughtTests(TestCase):
+    def setUp(self):
+        self.tag = EmotionTag.objects.create(name='Happy')
+
+    def test_signup_publishes_session_drafts(self):
+        self.client.post(reverse('landing_page'), {'content': 'before signup', 'emotion_tag': self.tag.id})
+        self.assertEqual(DraftThought.objects.count(), 1)
+        self.client.post(reverse('signup'), {
+            'username': 'new@example.com', 'password1': 'Str0ng-pass!', 'password2': 'Str0ng-pass!',
+        })
+        thought = Thought.objects.get()
+        self.assertEqual(thought.author.username, 'new@example.com')
+        self.assertEqual(thought.content, 'before signup')
+        self.assertFalse(DraftThought.objects.exists())
+
+    def test_published_drafts_are_counted_and_pushed_live(self):
+        user = make_user()
+        for i in range(2):
+            DraftThought.objects.create(content=f'draft {i}', session_key='s1', emotion_tag=self.tag)
+        metrics.reset()
+        sent = []
+        with mock.patch.object(live.thoughts, 'publish', sent.append), \
+                mock.patch.object(live.Broadcaster, '__len__', return_value=1):
+            with self.captureOnCommitCallbacks(execute=True):
+                DraftThought.publish_pending(user, 's1')
+        self.assertEqual(len(sent), 2)
+        self.assertEqual(metrics._totals[('thoughtify_thoughts_created_total', ())], 2)
+
+    def test_expired_drafts_are_not_published_and_get_purged(self):
+        user = make_user()
+        old = timezone.now() - timedelta(days=2)
+        for i in range(5):
+            DraftThought.objects.create(content=f'old {i}', session_key='s1', created_at=old)
+        DraftThought.objects.create(content='fresh', session_key='s2')
+        self.assertEqual(DraftThought.publish_pending(user, 's1'), [])
+        call_command('purge_drafts', batch_size=2, pause=0, stdout=StringIO())
+        self.assertEqual(list(DraftThought.objects.values_list('content', flat=True)), ['fresh'])
+
+    def test_session_lookup_uses_index(self):
+        queryset = DraftThought.objects.filter(session_key='s1', created_at__gte=DraftThought.expiry_cutoff())
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        self.assertIn('draft_session_idx', plan)
+
+
+class SessionWriteTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+
+    def test_login_keeps_credentials_out_of_session(self):
+        self.client.post(reverse('login'), {'username': 'alice@example.com', 'password': 'pass12345!'})
+        session = self.client.session
+        self.assertEqual(session['_auth_user_id'], str(self.user.pk))
+        self.assertNotIn('saved_password', session)
+        self.assertNotIn('saved_email', session)
+
+    def test_page_views_do_not_write_sessions(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('feed'))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('feed'))
+            self.client.get(reverse('my_thoughts'))
+        writes = [q['sql'] for q in queries.captured_queries
+                  if 'django_session' in q['sql'] and not q['sql'].startswith('SELECT')]
+        self.assertEqual(writes, [])
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+    def test_purge_sessions_deletes_expired_in_batches(self):
+        from django.contrib.sessions.models import Session
+        past = timezone.now() - timedelta(days=1)
+        for i in range(5):
+            Session.objects.create(session_key=f'expired{i}', session_data='', expire_date=past)
+        Session.objects.create(session_key='live', session_data='', expire_date=timezone.now() + timedelta(days=1))
+        call_command('purge_sessions', batch_size=2, pause=0, stdout=StringIO())
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['live'])
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.user = make_user()
+        tag = EmotionTag.objects.create(name='Happy')
+        for i in range(5):
+            Thought.objects.create(author=make_user(f'u{i}@example.com', f'B00{i}'), content=f'thought {i}',
+                                   emotion_tag=tag)
+        self.client.force_login(self.user)
+
+    def test_server_timing_and_histogram(self):
+        response = self.client.get(reverse('feed'))
+        header = response['Server-Timing']
+        self.assertRegex(header, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertIn('tpl;dur=', header)
+        self.assertIn(f'size;desc="{len(response.content)} bytes"', header)
+        stats = metrics.snapshot()['feed']
+        self.assertEqual(stats['latency_ms']['count'], 1)
+        self.assertGreater(stats['template_ms']['max'], 0)
+        self.assertEqual(stats['response_bytes']['max'], len(response.content))
+
+    def test_view_query_counts_stay_within_budget(self):
+        for _ in range(2):
+            self.client.get(reverse('feed'))
+            self.client.get(reverse('my_thoughts'))
+            self.client.post(reverse('like_thought', args=[Thought.objects.first().id]))
+        stats = metrics.snapshot()
+        for view_name in ('feed', 'my_thoughts', 'like_thought'):
+            self.assertLessEqual(stats[view_name]['queries']['max'], settings.QUERY_BUDGETS[view_name], view_name)
+
+    @override_settings(QUERY_BUDGETS={'feed': 1})
+    def test_over_budget_logs_warning(self):
+        with self.assertLogs('thoughtify.middleware', 'WARNING') as logs:
+            self.client.get(reverse('feed'))
+        self.assertIn('feed ran', logs.output[0])
+
+
+class MetricsEndpointTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.metrics_dir = tempfile.mkdtemp()
+        self.settings_override = override_settings(METRICS_DIR=self.metrics_dir, METRICS_TOKEN='s3cret')
+        self.settings_override.enable()
+        metrics.reset()
+        self.user = make_user()
+        self.client.force_login(self.user)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.metrics_dir, ignore_errors=True)
+
+    def scrape(self):
+        return self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer s3cret').content.decode()
+
+    def write_worker_file(self, filename, value):
+        with open(os.path.join(self.metrics_dir, filename), 'w') as handle:
+            handle.write(f'[["thoughtify_likes_created_total", {{}}, {value}]]')
+
+    def test_exposes_histograms_counters_and_gauges(self):
+        thought = Thought.objects.create(author=self.user, content='hello')
+        self.client.post(reverse('like_thought', args=[thought.id]))
+        self.client.get(reverse('feed'))
+        body = self.scrape()
+        self.assertIn('# TYPE thoughtify_request_duration_seconds histogram', body)
+        self.assertIn('thoughtify_request_duration_seconds_bucket{le="+Inf",view="feed"} 1', body)
+        self.assertIn('thoughtify_thoughts_created_total 1', body)
+        self.assertIn('thoughtify_likes_created_total 1', body)
+        self.assertIn('thoughtify_draft_thoughts 0', body)
+        self.assertIn('thoughtify_sessions ', body)
+
+    def test_sums_other_workers(self):
+        metrics.inc('thoughtify_likes_created_total', 2)
+        # The parent process is alive, so its file is read but kept
+        self.write_worker_file(f'{os.getppid()}-1.json', 5)
+        self.assertIn('thoughtify_likes_created_total 7', self.scrape())
+        self.assertTrue(os.path.exists(os.path.join(self.metrics_dir, f'{os.getppid()}-1.json')))
+
+    def test_exited_workers_are_folded_into_the_archive(self):
+        dead_pid = 4194304  # the largest pid_max Linux allows, so never a running pid
+        self.write_worker_file(f'{dead_pid}-1.json', 5)
+        self.write_worker_file(f'{dead_pid + 1}.json', 1)
+        # A reused pid: only the newer file belongs to the running process
+        self.write_worker_file(f'{os.getppid()}-1.json', 3)
+        self.write_worker_file(f'{os.getppid()}-2.json', 4)
+        for _ in range(2):
+            self.assertIn('thoughtify_likes_created_total 13', self.scrape())
+        self.assertEqual(
+            sorted(name for name in os.listdir(self.metrics_dir) if not name.startswith(str(os.getpid()))),
+            [f'{os.getppid()}-2.json', metrics.ARCHIVE],
+        )
+
+    def test_prune_skips_while_another_worker_holds_the_lock(self):
+        self.write_worker_file('4194304-1.json', 5)
+        lock_path = os.path.join(self.metrics_dir, metrics.PRUNE_LOCK)
+        open(lock_path, 'w').close()
+        metrics.prune()
+        self.assertTrue(os.path.exists(os.path.join(self.metrics_dir, '4194304-1.json')))
+        # A lock left behind by a crashed worker is taken over once stale
+        stale = time.time() - metrics.PRUNE_LOCK_TIMEOUT - 1
+        os.utime(lock_path, (stale, stale))
+        metrics.prune()
+        self.assertEqual(sorted(os.listdir(self.metrics_dir)), [metrics.ARCHIVE])
+
+    def test_feed_card_hit_ratio(self):
+        Thought.objects.create(author=self.user, content='hello')
+        for _ in range(2):
+            self.client.get(reverse('feed'))
+        body = self.scrape()
+        self.assertIn('thoughtify_fragment_cache_requests_total{fragment="thought_card_compact",result="hit"} 1', body)
+        self.assertIn('thoughtify_feed_cache_hit_ratio 0.5', body)
+        # The storage backend no longer counts anything itself
+        cache.get(make_template_fragment_key('thought_card_compact', ['x']))
+        self.assertIn('{fragment="thought_card_compact",result="miss"} 1', self.scrape())
+
+    def test_scrape_needs_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        # Same host gets no exception
+        self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='127.0.0.1').status_code, 403)
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        with override_settings(METRICS_TOKEN=''):
+            self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer ').status_code, 403)
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200)
+
+
+class LiveFeedTests(TestCase):
+    def test_broadcaster_fans_out_and_bounds_queues(self):
+        async def scenario():
+            broadcaster = live.Broadcaster(queue_size=2)
+            first, second = broadcaster.subscribe(), broadcaster.subscribe()
+            # Published from a worker thread, as a sync view would
+            thread = threading.Thread(target=lambda: [broadcaster.publish(n) for n in range(3)])
+            thread.start()
+            thread.join()
+            await asyncio.sleep(0)
+            received = [[queue.get_nowait() for _ in range(queue.qsize())] for queue in (first, second)]
+            broadcaster.unsubscribe(first)
+            broadcaster.unsubscribe(second)
+            return received, len(broadcaster)
+
+        received, remaining = asyncio.run(scenario())
+        # Each queue keeps the newest two cards
+        self.assertEqual(received, [[1, 2], [1, 2]])
+        self.assertEqual(remaining, 0)
+
+    def test_new_public_thought_is_pushed_after_commit(self):
+        user = make_user()
+        sent = []
+        with mock.patch.object(live.thoughts, 'publish', sent.append), \
+                mock.patch.object(live.Broadcaster, '__len__', return_value=1):
+            with self.captureOnCommitCallbacks(execute=True):
+                Thought.objects.create(author=user, content='fresh thought')
+            Thought.objects.create(author=user, content='private', is_public=False)
+        self.assertEqual(len(sent), 1)
+        self.assertIn('fresh thought', sent[0])
+        self.assertIn('like-', sent[0])
+
+    def test_stream_sends_events(self):
+        async def scenario():
+            broadcaster = live.Broadcaster()
+            events = live.stream(broadcaster)
+            first = await events.__anext__()
+            broadcaster.publish('<div>\ncard</div>')
+            second = await events.__anext__()
+            await events.aclose()
+            return first, second, len(broadcaster)
+
+        first, second, remaining = asyncio.run(scenario())
+        self.assertEqual(first, 'retry: 5000\n\n')
+        self.assertEqual(second, 'event: thought\ndata: <div>\ndata: card</div>\n\n')
+        self.assertEqual(remaining, 0)
+
+    def test_wsgi_request_gets_no_stream(self):
+        self.client.force_login(make_user())
+        self.assertEqual(self.client.get(reverse('live_feed')).status_code, 204)
+
+
+@override_settings(LIVE_FEED_MAX_SECONDS=2)
+class LiveFeedThreadTests(TransactionTestCase):
+    # Real ASGI requests run their sync code in other threads, which need committed rows
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(make_user())
+        self.cookie = f'{settings.SESSION_COOKIE_NAME}={self.client.cookies[settings.SESSION_COOKIE_NAME].value}'
+        self.app = ASGIHandler()
+
+    async def open_stream(self):
+        """Start a live feed request and wait for its first event; returns (task, disconnect)"""
+        started, disconnect = asyncio.Event(), asyncio.Event()
+        body = [{'type': 'http.request', 'body': b''}]
+
+        async def receive():
+            if body:
+                return body.pop()
+            await disconnect.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                self.assertEqual(message['status'], 200)
+            else:
+                started.set()
+
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': reverse('live_feed'), 'query_string': b'', 'root_path': '',
+            'headers': [(b'host', b'testserver'), (b'cookie', self.cookie.encode())],
+        }
+        task = asyncio.create_task(self.app(scope, receive, send))
+        await asyncio.wait([task, asyncio.ensure_future(started.wait())], timeout=5,
+                           return_when=asyncio.FIRST_COMPLETED)
+        if task.done():
+            task.result()
+        self.assertTrue(started.is_set())
+        return task, disconnect
+
+    def test_asgiref_internals_are_supported(self):
+        # If this fails after an asgiref upgrade, request_threads.release() has become a no-op
+        self.assertTrue(request_threads.SUPPORTED, 'asgiref no longer exposes the per-request executors')
+
+    def test_open_streams_hold_no_threads(self):
+        async def scenario():
+            # The first stream starts the loop's shared thread pool
+            streams = [await self.open_stream()]
+            baseline = threading.active_count()
+            streams += [await self.open_stream() for _ in range(5)]
+            # Released threads exit once they see the shutdown
+            for _ in range(50):
+                if threading.active_count() <= baseline:
+                    break
+                await asyncio.sleep(0.02)
+            during = threading.active_count()
+            for _, disconnect in streams:
+                disconnect.set()
+            await asyncio.gather(*(task for task, _ in streams))
+            return baseline, during
+
+        baseline, during = asyncio.run(scenario())
+        self.assertLessEqual(during, baseline)
+
+
+@receiver(setting_changed)
+def reload_urls(setting, **kwargs):
+    # urls.py picks the sync or async views on import
+    if setting == 'ASYNC_VIEWS':
+        reload(import_module('thoughtify.urls'))
+        reload(import_module(settings.ROOT_URLCONF))
+        clear_url_caches()
+
+
+class ViewDispatchTests(TestCase):
+    def test_wsgi_serves_the_sync_views(self):
+        self.assertIs(resolve(reverse('feed')).func, views.feed)
+
+    @override_settings(ASYNC_VIEWS=True)
+    def test_asgi_serves_the_async_views(self):
+        self.assertIs(resolve(reverse('feed')).func, views.afeed)
+        self.assertIs(resolve(reverse('my_thoughts')).func, views.amy_thoughts_view)
+        self.assertIs(resolve(reverse('profile')).func, views.aprofile_view)
+
+
+@override_settings(ASYNC_VIEWS=True)
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = make_user()
+        tag = EmotionTag.objects.create(name='Happy')
+        Thought.objects.create(author=self.user, content='async hello', emotion_tag=tag)
+        self.async_client.force_login(self.user)
+
+    async def test_read_views_serve_async_requests(self):
+        for name in ('feed', 'my_thoughts', 'profile'):
+            response = await self.async_client.get(reverse(name))
+            self.assertEqual(response.status_code, 200, name)
+            # Queries made by the async ORM are still counted by the middleware
+            self.assertRegex(response['Server-Timing'], r'desc="[1-9]\d* queries"')
+        response = await self.async_client.get(reverse('feed'))
+        self.assertContains(response, 'async hello')
+
+    async def test_cache_is_read_off_the_event_loop(self):
+        # The SQLite cache blocks, like the ORM: tag versions, card fragments and sessions all read it
+        loop_thread = threading.get_ident()
+        readers = []
+        real_get = SQLiteCache.get
+
+        def get(backend, *args, **kwargs):
+            readers.append(threading.get_ident())
+            return real_get(backend, *args, **kwargs)
+
+        with mock.patch.object(SQLiteCache, 'get', get):
+            for name in ('feed', 'my_thoughts', 'profile'):
+                await self.async_client.get(reverse(name))
+        self.assertTrue(readers)
+        self.assertNotIn(loop_thread, readers)
+
+    async def test_anonymous_user_is_sent_to_login(self):
+        response = await AsyncClient().get(reverse('feed'))
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response['Location'].startswith(reverse('login')))
+
+
+@override_settings(TRENDING_HALF_LIFE=3600)
+class TrendingTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.other = make_user('bob@example.com', 'B001')
+        self.old = Thought.objects.create(author=self.user, content='old news')
+        self.new = Thought.objects.create(author=self.user, content='fresh')
+        self.epoch = TrendingEpoch.current()
+
+    def like(self, user, thought, hours_ago=0):
+        """Toggle a like as if it happened ``hours_ago``"""
+        at = timezone.now() - timedelta(hours=hours_ago)
+        with mock.patch('django.utils.timezone.now', return_value=at):
+            return Like.toggle(user, thought.id)
+
+    def scores(self):
+        return dict(Thought.objects.values_list('id', 'trending_score'))
+
+    def test_recent_likes_outrank_older_ones(self):
+        # Two likes three half-lives ago are worth a quarter of one like now
+        self.like(self.user, self.old, hours_ago=3)
+        self.like(self.other, self.old, hours_ago=3)
+        self.like(self.user, self.new)
+        scores = self.scores()
+        self.assertAlmostEqual(scores[self.old.id] / scores[self.new.id], 0.25, places=3)
+        self.assertEqual(list(trending.trending_queryset()), [self.new, self.old])
+
+    def test_unlike_removes_exactly_that_likes_weight(self):
+        self.like(self.user, self.old, hours_ago=2)
+        self.like(self.other, self.old)
+        self.like(self.user, self.old)  # unlike the older like
+        self.assertAlmostEqual(self.scores()[self.old.id], trending.like_weight(
+            Like.objects.get(user=self.other).created_at, TrendingEpoch.current()
+        ))
+        self.like(self.other, self.old)
+        self.assertEqual(self.scores()[self.old.id], 0.0)
+
+    def test_rebase_rescales_without_changing_the_order(self):
+        self.like(self.user, self.old, hours_ago=2)
+        self.like(self.user, self.new)
+        before = self.scores()
+        rescaled, dropped = trending.rebase(self.epoch + timedelta(hours=1))
+        after = self.scores()
+        self.assertEqual((rescaled, dropped), (2, 0))
+        self.assertAlmostEqual(after[self.new.id], before[self.new.id] / 2)
+        self.assertAlmostEqual(after[self.old.id] / after[self.new.id], 0.25, places=4)
+        # A day later both have faded below the floor and leave the index range
+        self.assertEqual(trending.rebase(self.epoch + timedelta(hours=25)), (0, 2))
+        self.assertFalse(trending.trending_queryset().exists())
+
+    def test_rebuild_matches_incremental_scores(self):
+        self.like(self.user, self.old, hours_ago=1)
+        self.like(self.other, self.new, hours_ago=2)
+        trending.rebase()
+        incremental = self.scores()
+        call_command('rebase_trending', rebuild=True, stdout=StringIO())
+        for thought_id, score in self.scores().items():
+            self.assertAlmostEqual(score, incremental[thought_id], places=6)
+
+    def test_trending_page_reads_the_index(self):
+        self.like(self.user, self.new)
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('trending'))
+        self.assertContains(response, 'fresh')
+        self.assertNotContains(response, 'old news')
+        sql, params = trending.trending_queryset()[:50].query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        self.assertIn('thought_public_trending_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
+class MoodRollupTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.happy = EmotionTag.objects.create(name='Happy')
+        self.sad = EmotionTag.objects.create(name='Sad')
+        self.today = timezone.now()
+
+    def counts(self):
+        return {(row.day, row.emotion_tag_id, row.sentiment): row.thoughts for row in MoodRollup.objects.all()}
+
+    def recounted(self):
+        before = self.counts()
+        rollups.rebuild(chunk_days=1)
+        return before, self.counts()
+
+    def test_triggers_follow_creates_edits_and_deletes(self):
+        yesterday = self.today - timedelta(days=1)
+        first = Thought.objects.create(author=self.user, content='a', emotion_tag=self.happy)
+        Thought.objects.create(author=self.user, content='b', emotion_tag=self.happy, created_at=yesterday)
+        Thought.objects.bulk_create([
+            Thought(author=self.user, content='c', emotion_tag=self.sad, sentiment='negative'),
+        ])
+        first.emotion_tag = self.sad
+        first.save()
+        # The sentiment worker writes through a queryset update
+        Thought.save_sentiments(Thought.pending_sentiment(10), ['positive', 'positive', 'positive'])
+        Thought.objects.filter(content='c').delete()
+
+        self.assertEqual(self.counts(), {
+            (self.today.date(), self.sad.id, 'positive'): 1,
+            (yesterday.date(), self.happy.id, 'positive'): 1,
+        })
+        before, after = self.recounted()
+        self.assertEqual(before, after)
+
+    def test_deleting_a_tag_moves_its_thoughts_to_untagged(self):
+        Thought.objects.create(author=self.user, content='a', emotion_tag=self.happy)
+        self.happy.delete()
+        self.assertEqual(self.counts(), {(self.today.date(), None, 'neutral'): 1})
+        day = self.today.date()
+        self.assertEqual(rollups.summary(day, day)['emotion_tags'], {rollups.UNTAGGED: 1})
+
+    def test_migrate_rebuilds_on_the_migrated_database(self):
+        from .apps import ensure_mood_rollups
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TRIGGER {next(iter(rollups.TRIGGERS))}')
+        with mock.patch.object(rollups, 'rebuild') as rebuild, \
+                mock.patch.object(rollups, 'rebuild_timelines') as rebuild_timelines:
+            ensure_mood_rollups(sender=None, using=connection.alias)
+        rebuild.assert_called_once_with(conn=connection)
+        rebuild_timelines.assert_called_once_with(conn=connection)
+
+    def test_rebuild_command_recounts_in_chunks(self):
+        for days_ago in range(5):
+            Thought.objects.create(author=self.user, content='x', emotion_tag=self.happy,
+                                   created_at=self.today - timedelta(days=days_ago))
+        expected = self.counts()
+        MoodRollup.objects.update(thoughts=99)
+        MoodRollup.objects.create(day=self.today.date() - timedelta(days=40), sentiment='neutral', thoughts=3)
+        out = StringIO()
+        call_command('rebuild_mood_rollups', chunk_days=2, stdout=out)
+        self.assertEqual(self.counts(), expected)
+        self.assertIn('Rebuilt mood rollups: 5 rows', out.getvalue())
+
+    def test_endpoint_and_dashboard_read_the_rollups(self):
+        Thought.objects.create(author=self.user, content='a', emotion_tag=self.happy, sentiment='positive')
+        Thought.objects.create(author=self.user, content='b', emotion_tag=self.sad,
+                               created_at=self.today - timedelta(days=10))
+        self.client.force_login(self.user)
+        with self.assertNumQueries(3):  # session, user, rollups
+            data = self.client.get(reverse('mood_analytics'), {'days': '7'}).json()
+        self.assertEqual(data['total'], 1)
+        self.assertEqual(data['emotion_tags'], {'Happy': 1})
+        self.assertEqual(data['days'][0]['sentiments'], {'positive': 1})
+
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'pass12345!')
+        self.client.force_login(admin_user)
+        response = self.client.get(reverse('admin:thoughtify_moodrollup_changelist'))
+        self.assertContains(response, 'Last 30 days: 2 thoughts')
+
+
+class MoodTimelineTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.other = make_user('bob@example.com', 'B001')
+        self.happy = EmotionTag.objects.create(name='Happy')
+        self.today = timezone.now().date()
+
+    def timeline_rows(self, user):
+        return {(row.period, row.starts_on, row.emotion_tag_id, row.sentiment): row.thoughts
+                for row in UserMoodRollup.objects.filter(user=user)}
+
+    def test_triggers_keep_each_users_weeks_and_months(self):
+        now = timezone.now()
+        first = Thought.objects.create(author=self.user, content='a', emotion_tag=self.happy)
+        Thought.objects.create(author=self.user, content='b', emotion_tag=self.happy,
+                               created_at=now - timedelta(days=40))
+        Thought.objects.create(author=self.user, content='c', sentiment='positive')
+        Thought.objects.create(author=None, content='nobody')
+        Thought.objects.filter(pk=first.pk).update(author=self.other)
+        Thought.objects.filter(content='c').delete()
+
+        week = self.today - timedelta(days=self.today.weekday())
+        self.assertEqual(self.timeline_rows(self.other), {
+            ('week', week, self.happy.id, 'neutral'): 1,
+            ('month', self.today.replace(day=1), self.happy.id, 'neutral'): 1,
+        })
+        before = {user: self.timeline_rows(user) for user in (self.user, self.other)}
+        rollups.rebuild_timelines(batch_size=1)
+        self.assertEqual(before, {user: self.timeline_rows(user) for user in (self.user, self.other)})
+
+    def test_streak_follows_consecutive_daily_thoughts(self):
+        profile = self.user.userprofile
+        start = self.today - timedelta(days=10)
+        for offset in (0, 1, 2, 4, 5):
+            profile.record_daily_thought(start + timedelta(days=offset))
+        self.assertEqual((profile.daily_streak, profile.longest_daily_streak), (2, 3))
+        self.assertEqual(profile.current_daily_streak(start + timedelta(days=6)), 2)
+        self.assertEqual(profile.current_daily_streak(start + timedelta(days=7)), 0)
+
+    def test_my_thoughts_shows_the_timeline_and_streak(self):
+        self.client.force_login(self.user)
+        self.client.post(reverse('create_thought'), {
+            'content': 'today', 'emotion_tag': self.happy.id, 'is_daily_thought': 'true',
+        })
+        response = self.client.get(reverse('my_thoughts'))
+        self.assertContains(response, '1 day daily streak')
+        self.assertContains(response, 'Happy 1')
+        periods = response.context['timeline']
+        self.assertEqual([period['total'] for period in periods['week']], [1])
+        self.assertEqual(periods['month'][0]['sentiments'][1][2:], (1, 100))
@@ -0,0 +1,84 @@
+"""
+Trending thoughts: likes that lose half their weight every TRENDING_HALF_LIFE.
+
+Storing each thought's decayed total directly would mean rewriting every
+score as time passes. Instead a like made at ``t`` adds
+2 ** ((t - epoch) / half_life) to Thought.trending_score. That is its
+decayed weight multiplied by a factor shared by every thought, so ranking by
+the stored column gives the same order, and a like only ever touches its
+own thought's row.
+
+Weights grow as time moves away from the epoch, so rebase() moves the epoch
+up to now and scales every score down to match. Run it from cron at least
+daily (rebase_trending); a float overflows after about a thousand half-lives.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Like, Thought, TrendingEpoch
+
+# Scores below one like this many half-lives old count as zero
+MIN_SCORE_HALF_LIVES = 7
+MIN_SCORE = 2 ** -MIN_SCORE_HALF_LIVES
+
+
+def half_life():
+    return getattr(settings, 'TRENDING_HALF_LIFE', 6 * 3600)
+
+
+def like_weight(liked_at, epoch):
+    return 2 ** ((liked_at - epoch).total_seconds() / half_life())
+
+
+def trending_queryset():
+    """Public thoughts by trending score, served in order by thought_public_trending_idx"""
+    return (Thought.objects.select_related('author__userprofile', 'emotion_tag')
+            .filter(is_public=True, trending_score__gte=score_floor())
+            .order_by('-trending_score', '-id'))
+
+
+def score_floor():
+    # Between rebases the same threshold, in current units
+    return MIN_SCORE * like_weight(timezone.now(), TrendingEpoch.current())
+
+
+def rebase(now=None):
+    """
+    Move the epoch to ``now`` and rescale every score in one transaction.
+
+    Returns (rescaled, dropped) row counts. Scores that fall under MIN_SCORE
+    are zeroed so they leave the index range the trending page reads.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        state, _ = TrendingEpoch.objects.get_or_create(pk=1)
+        factor = 1 / like_weight(now, state.epoch)
+        scored = Thought.objects.filter(trending_score__gt=0)
+        dropped = scored.filter(trending_score__lt=MIN_SCORE / factor).update(trending_score=0.0)
+        rescaled = scored.update(trending_score=F('trending_score') * factor)
+        state.epoch = now
+        state.save(update_fields=['epoch'])
+    return rescaled, dropped
+
+
+def rebuild(now=None):
+    """Recompute every score from the Like table, epoch at ``now``; returns the thoughts scored"""
+    now = now or timezone.now()
+    # Older likes would be dropped by the next rebase anyway
+    cutoff = now - timedelta(seconds=half_life() * MIN_SCORE_HALF_LIVES)
+    scores = {}
+    likes = Like.objects.filter(created_at__gte=cutoff).values_list('thought_id', 'created_at')
+    for thought_id, created_at in likes.iterator():
+        scores[thought_id] = scores.get(thought_id, 0.0) + like_weight(created_at, now)
+    with transaction.atomic():
+        TrendingEpoch.objects.update_or_create(pk=1, defaults={'epoch': now})
+        Thought.objects.filter(trending_score__gt=0).update(trending_score=0.0)
+        Thought.objects.bulk_update(
+            [Thought(id=thought_id, trending_score=score) for thought_id, score in scores.items()],
+            ['trending_score'], batch_size=500,
+        )
+    return len(scores)
@@ -1,10 +1,21 @@
+from django.conf import settings
 from django.urls import path
 from django.contrib.auth import views as auth_views
 from . import views
 
+# Chosen per deployment: the view's sync or async mode is fixed when the URLconf loads
+if settings.ASYNC_VIEWS:
+    feed, profile, my_thoughts = views.afeed, views.aprofile_view, views.amy_thoughts_view
+else:
+    feed, profile, my_thoughts = views.feed, views.profile_view, views.my_thoughts_view
+
 urlpatterns = [
     path('', views.landing_page, name='landing_page'),
-    path('feed/', views.feed, name='feed'),
+    path('feed/', feed, name='feed'),
+    path('feed/live/', views.live_feed, name='live_feed'),
+    path('trending/', views.trending_view, name='trending'),
+    path('analytics/moods/', views.mood_analytics, name='mood_analytics'),
+    path('search/', views.search_view, name='search'),
     path('thought/create/', views.create_thought, name='create_thought'),
     path('thought/<int:thought_id>/update/', views.update_thought, name='update_thought'),
     path('thought/<int:thought_id>/delete/', views.delete_thought, name='delete_thought'),
@@ -15,6 +26,9 @@ urlpatterns = [
     path('signup/', views.signup_view, name='signup'),
     path('login/', views.login_view, name='login'),
     path('logout/', auth_views.LogoutView.as_view(next_page='landing_page'), name='logout'),
-    path('profile/', views.profile_view, name='profile'),
-    path('my-thoughts/', views.my_thoughts_view, name='my_thoughts'),
+    path('profile/', profile, name='profile'),
+    path('my-thoughts/', my_thoughts, name='my_thoughts'),
+
+    # Operations
+    path('metrics', views.metrics_view, name='metrics'),
 ]
@@ -1,21 +1,75 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.views import redirect_to_login
 from django.contrib.auth import login
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponseForbidden, HttpResponse
+from django.http import JsonResponse, HttpResponseForbidden, HttpResponse, Http404, StreamingHttpResponse
 from django.core.paginator import Paginator
+from django.db import connection
 from django.db.models import Q
 from django.utils import timezone
-from .models import Thought, EmotionTag, UserProfile, DraftThought, Like
+from .models import Thought, UserProfile, DraftThought, Like
 from .forms import ThoughtForm, UserSignUpForm, UserProfileForm, EmailAuthenticationForm
+from .pagination import KeysetPaginator, next_page_url
+from .search import search_thoughts
+from .tag_cache import aget_emotion_tags, get_emotion_tags
+from .trending import trending_queryset
+from . import live, metrics, rollups
 from django.contrib.auth import authenticate
 from django.core.mail import send_mail
 from django.conf import settings
 from django.utils.crypto import get_random_string
 from django.views.decorators.http import require_POST
+from importlib import import_module
+from asgiref.sync import sync_to_async
+from functools import wraps
+from datetime import timedelta
+import hmac
+from django.core.handlers.asgi import ASGIRequest
+
+# Scores shift with every like, so the trending page is one ranked page, not a paginated list
+TRENDING_PAGE_SIZE = 50
+
+MOOD_ANALYTICS_MAX_DAYS = 366
+# Periods shown on the my thoughts mood timeline
+TIMELINE_WEEKS = 8
+TIMELINE_MONTHS = 6
+
+def mark_liked(request, thoughts):
+    """Flag each thought the current user liked, for any page rendering like buttons"""
+    liked_ids = Like.liked_thought_ids(request.user, thoughts)
+    for thought in thoughts:
+        thought.liked = thought.id in liked_ids
+
+async def aget_user(request):
+    """request.user, loaded off the event loop (request.auser() only arrives in Django 5.0)"""
+    def load():
+        user = request.user
+        user.is_authenticated  # resolves the lazy session and user lookups
+        return user
+    return await sync_to_async(load)()
+
+def async_login_required(view):
+    """login_required for async views, which Django 4.2's decorator can't wrap"""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await aget_user(request)
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+async def arender(request, template_name, context):
+    """render() for async views: {% cache %} and the session-backed context processors block, so render in a thread"""
+    return await sync_to_async(render)(request, template_name, context)
+
+async def amark_liked(request, thoughts):
+    liked_ids = await Like.aliked_thought_ids(request.user, thoughts)
+    for thought in thoughts:
+        thought.liked = thought.id in liked_ids
 
 def landing_page(request):
-    emotion_tags = EmotionTag.objects.all()
+    emotion_tags = get_emotion_tags()
     if request.method == 'POST':
         form = ThoughtForm(request.POST)
         if form.is_valid():
@@ -26,13 +80,15 @@ def landing_page(request):
                 messages.success(request, 'Your thought has been shared!')
                 return redirect('feed')
             else:
-                # Store draft thought in session
-                draft = DraftThought.objects.create(
+                # Key drafts by a random token kept in the session: signed-cookie
+                # sessions have no stable session_key to use instead
+                if 'draft_key' not in request.session:
+                    request.session['draft_key'] = get_random_string(32)
+                DraftThought.objects.create(
                     content=form.cleaned_data['content'],
                     emotion_tag=form.cleaned_data.get('emotion_tag'),
-                    session_key=request.session.session_key or request.session.create()
+                    session_key=request.session['draft_key']
                 )
-                request.session['draft_thought_id'] = draft.id
                 return redirect('signup')
     else:
         form = ThoughtForm()
@@ -57,6 +113,10 @@ def signup_view(request):
             profile.email_confirmed = True  # Mark as confirmed
             profile.confirmation_token = ''
             profile.save()
+            # Drafts written before signing up were keyed by this session
+            if DraftThought.publish_pending(user, request.session.get('draft_key')):
+                del request.session['draft_key']
+                messages.success(request, 'Your draft thought has been shared.')
             messages.success(request, 'Account created! You can now log in.')
             return redirect('login')
     else:
@@ -70,33 +130,179 @@ def my_thoughts_view(request):
     user_profile = request.user.userprofile
     thoughts = Thought.objects.filter(author=request.user).select_related('author__userprofile', 'emotion_tag')
     paginator = Paginator(thoughts, 20)
-    page = request.GET.get('page', 1)
-    thoughts_page = paginator.get_page(page)
+    thoughts_page = paginator.get_page(request.GET.get('page', 1))
+    mark_liked(request, thoughts_page)
+    today = timezone.now().date()
     return render(request, 'thoughtify/my_thoughts.html', {
         'thoughts': thoughts_page,
         'user_profile': user_profile,
+        'timeline': mood_timeline(request.user, today),
+        'daily_streak': user_profile.current_daily_streak(today),
     })
 
+@async_login_required
+async def amy_thoughts_view(request):
+    user_profile = await UserProfile.objects.aget(user=request.user)
+    thoughts = Thought.objects.filter(author=request.user).select_related('author__userprofile', 'emotion_tag')
+    paginator = Paginator(thoughts, 20)
+    # Count up front: Paginator would otherwise run COUNT(*) synchronously
+    paginator.count = await thoughts.acount()
+    thoughts_page = paginator.get_page(request.GET.get('page', 1))
+    thoughts_page.object_list = [thought async for thought in thoughts_page.object_list.aiterator()]
+    await amark_liked(request, thoughts_page)
+    today = timezone.now().date()
+    timeline = await sync_to_async(mood_timeline)(request.user, today)
+    # Everything the template reads is loaded, so rendering runs no queries
+    return await arender(request, 'thoughtify/my_thoughts.html', {
+        'thoughts': thoughts_page,
+        'user_profile': user_profile,
+        'timeline': timeline,
+        'daily_streak': user_profile.current_daily_streak(today),
+    })
+
+def mood_timeline(user, today):
+    """The user's recent weeks and months, read from their timeline rollups rather than their thoughts"""
+    rows = rollups.timeline_queryset(user, today, TIMELINE_WEEKS, TIMELINE_MONTHS)
+    return rollups.timeline(rows)
+
+def feed_filters(params):
+    """Valid feed filters from the query string; anything unrecognised is dropped"""
+    filters = {}
+    tag = params.get('tag', '')
+    if tag.isdigit():
+        filters['emotion_tag_id'] = int(tag)
+    sentiment = params.get('sentiment')
+    if sentiment in dict(Thought.SENTIMENT_CHOICES):
+        filters['sentiment'] = sentiment
+    if params.get('daily') == '1':
+        filters['is_daily_thought'] = True
+    return filters
+
+def feed_queryset(filters):
+    # Each filter has a matching partial index on public thoughts, see Thought.Meta
+    return Thought.objects.select_related('author__userprofile', 'emotion_tag').filter(
+        is_public=True, **filters
+    )
+
 @login_required
 def feed(request):
     user_profile = request.user.userprofile
-    thoughts = Thought.objects.select_related('author__userprofile', 'emotion_tag').filter(is_public=True)
+    filters = feed_filters(request.GET)
+    thoughts = feed_queryset(filters)
     # Feed now only shows public thoughts
     show_daily_nudge = user_profile.can_post_daily_thought()
-    paginator = Paginator(thoughts, 20)
-    page = request.GET.get('page', 1)
-    thoughts_page = paginator.get_page(page)
+    # Keyset pagination: no COUNT(*) and no OFFSET, so deep scrolls stay cheap
+    paginator = KeysetPaginator(thoughts, 20)
+    thoughts_page = paginator.get_page(request.GET.get('cursor'))
+    next_url = next_page_url(request, thoughts_page)
+    mark_liked(request, thoughts_page)
     if request.headers.get('HX-Request'):
         return render(request, 'thoughtify/partials/thought_list.html', {
-            'thoughts': thoughts_page
+            'thoughts': thoughts_page,
+            'next_page_url': next_url,
         })
-    emotion_tags = EmotionTag.objects.all()
     return render(request, 'thoughtify/feed.html', {
         'thoughts': thoughts_page,
+        'next_page_url': next_url,
+        'emotion_tags': get_emotion_tags(),
+        'sentiment_choices': Thought.SENTIMENT_CHOICES,
+        'active_tag': filters.get('emotion_tag_id'),
+        'active_sentiment': filters.get('sentiment'),
+        'daily_only': filters.get('is_daily_thought', False),
+        'show_daily_nudge': show_daily_nudge,
+        # New thoughts are pushed only onto the unfiltered first page
+        'live_feed': not filters and not request.GET.get('cursor'),
+    })
+
+@async_login_required
+async def afeed(request):
+    user_profile = await UserProfile.objects.aget(user=request.user)
+    filters = feed_filters(request.GET)
+    thoughts = feed_queryset(filters)
+    # Feed now only shows public thoughts
+    show_daily_nudge = user_profile.can_post_daily_thought()
+    # Keyset pagination: no COUNT(*) and no OFFSET, so deep scrolls stay cheap
+    paginator = KeysetPaginator(thoughts, 20)
+    thoughts_page = await paginator.aget_page(request.GET.get('cursor'))
+    next_url = next_page_url(request, thoughts_page)
+    await amark_liked(request, thoughts_page)
+    if request.headers.get('HX-Request'):
+        return await arender(request, 'thoughtify/partials/thought_list.html', {
+            'thoughts': thoughts_page,
+            'next_page_url': next_url,
+        })
+    emotion_tags = await aget_emotion_tags()
+    return await arender(request, 'thoughtify/feed.html', {
+        'thoughts': thoughts_page,
+        'next_page_url': next_url,
         'emotion_tags': emotion_tags,
-        'show_daily_nudge': show_daily_nudge
+        'sentiment_choices': Thought.SENTIMENT_CHOICES,
+        'active_tag': filters.get('emotion_tag_id'),
+        'active_sentiment': filters.get('sentiment'),
+        'daily_only': filters.get('is_daily_thought', False),
+        'show_daily_nudge': show_daily_nudge,
+        # New thoughts are pushed only onto the unfiltered first page
+        'live_feed': not filters and not request.GET.get('cursor'),
+    })
+
+async def live_feed(request):
+    """Server-Sent Events stream of newly published public thoughts"""
+    if not isinstance(request, ASGIRequest):
+        # Under WSGI the stream would pin a worker; 204 tells EventSource not to retry
+        return HttpResponse(status=204)
+    def authenticate():
+        try:
+            return request.user.is_authenticated
+        finally:
+            # Pool threads outlive the request, so don't leave this one a connection
+            connection.close()
+    # Off the request's own thread, which live.stream() releases
+    if not await sync_to_async(authenticate, thread_sensitive=False)():
+        return HttpResponseForbidden()
+    return StreamingHttpResponse(live.stream(), content_type='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        # Stop nginx from buffering events
+        'X-Accel-Buffering': 'no',
+    })
+
+@login_required
+def trending_view(request):
+    """Public thoughts ranked by recent likes, read in order from the trending index"""
+    thoughts = list(trending_queryset()[:TRENDING_PAGE_SIZE])
+    mark_liked(request, thoughts)
+    return render(request, 'thoughtify/feed.html', {
+        'thoughts': thoughts,
+        'emotion_tags': get_emotion_tags(),
+        'sentiment_choices': Thought.SENTIMENT_CHOICES,
+        'trending': True,
     })
 
+@login_required
+def mood_analytics(request):
+    """Board-wide thoughts per day by emotion tag and sentiment, read from the daily rollups"""
+    days = request.GET.get('days', '')
+    days = min(int(days), MOOD_ANALYTICS_MAX_DAYS) if days.isdigit() and int(days) > 0 else 30
+    # Rollup days are UTC days
+    end = timezone.now().date()
+    start = end - timedelta(days=days - 1)
+    return JsonResponse({'start': start.isoformat(), 'end': end.isoformat(), **rollups.summary(start, end)})
+
+@login_required
+def search_view(request):
+    query = request.GET.get('q', '').strip()
+    thoughts = Thought.objects.select_related('author__userprofile', 'emotion_tag').filter(is_public=True)
+    thoughts_page = search_thoughts(thoughts, query, request.GET.get('cursor'), per_page=20)
+    next_url = next_page_url(request, thoughts_page)
+    mark_liked(request, thoughts_page)
+    context = {
+        'query': query,
+        'thoughts': thoughts_page,
+        'next_page_url': next_url,
+    }
+    if request.headers.get('HX-Request'):
+        return render(request, 'thoughtify/partials/thought_list.html', context)
+    return render(request, 'thoughtify/search.html', context)
+
 @login_required
 def create_thought(request):
     is_daily_thought = request.POST.get('is_daily_thought') == 'true'
@@ -112,7 +318,7 @@ def create_thought(request):
                     messages.error(request, "You've already posted your daily thought")
                     return redirect('feed')
                 thought.is_daily_thought = True
-                request.user.userprofile.last_daily_thought = timezone.now().date()
+                request.user.userprofile.record_daily_thought(timezone.now().date())
                 request.user.userprofile.save()
             
             thought.save()
@@ -129,7 +335,7 @@ def create_thought(request):
     context = {
         'form': form,
         'is_daily_thought': is_daily_thought,
-        'emotion_tags': EmotionTag.objects.all()
+        'emotion_tags': get_emotion_tags()
     }
     return render(request, 'thoughtify/create_thought.html', context)
 
@@ -139,7 +345,11 @@ def update_thought(request, thought_id):
     if request.method == 'POST':
         form = ThoughtForm(request.POST, instance=thought)
         if form.is_valid():
-            form.save()
+            thought = form.save(commit=False)
+            if 'content' in form.changed_data:
+                # Queue the new text for the sentiment worker
+                thought.sentiment_scored_at = None
+            thought.save()
             messages.success(request, 'Your thought has been updated!')
             return redirect('feed')
     else:
@@ -182,40 +392,77 @@ def login_view(request):
             user = authenticate(request, username=email, password=password)
             if user is not None:
                 login(request, user)
-                request.session['saved_email'] = email
-                request.session['saved_password'] = password
                 messages.success(request, 'Login successful!')
                 return redirect('feed')
             else:
                 messages.error(request, 'Invalid email or password.')
-    else:
-        initial = {}
-        if 'saved_email' in request.session:
-            initial['username'] = request.session['saved_email']
-        if 'saved_password' in request.session:
-            initial['password'] = request.session['saved_password']
-        form = EmailAuthenticationForm(request, initial=initial)
     return render(request, 'thoughtify/login.html', {'form': form})
 
 @login_required
 def profile_view(request):
     user = request.user
-    profile = user.userprofile
     context = {
         'username': user.username,
         'real_name': f'{user.first_name} {user.last_name}'.strip(),
-        'profile': profile,
+        'profile': user.userprofile,
         'user': user,
     }
     return render(request, 'thoughtify/profile.html', context)
 
+@async_login_required
+async def aprofile_view(request):
+    user = request.user
+    profile = await UserProfile.objects.aget(user=user)
+    context = {
+        'username': user.username,
+        'real_name': f'{user.first_name} {user.last_name}'.strip(),
+        'profile': profile,
+        'user': user,
+    }
+    return await arender(request, 'thoughtify/profile.html', context)
+
 @require_POST
 @login_required
 def like_thought(request, thought_id):
-    thought = get_object_or_404(Thought, id=thought_id)
-    like, created = Like.objects.get_or_create(user=request.user, thought=thought)
-    if not created:
-        # If already liked, unlike
-        like.delete()
+    try:
+        liked, likes_count = Like.toggle(request.user, thought_id)
+    except Thought.DoesNotExist:
+        raise Http404('Thought not found')
+    thought = Thought(id=thought_id, likes_count=likes_count)
+    if request.headers.get('HX-Request'):
+        # Only the like button needs to change, not the whole feed
+        return render(request, 'thoughtify/partials/like_button.html', {
+            'thought': thought,
+            'liked': liked,
+        })
     # Redirect back to the page the user came from
     return redirect(request.META.get('HTTP_REFERER', 'feed'))
+
+def metrics_gauges():
+    """Point-in-time values read when /metrics is scraped"""
+    totals = metrics.collect()
+    lookups = {'hit': 0, 'miss': 0}
+    for (name, labels), value in totals.items():
+        labels = dict(labels)
+        # The card fragment shared by the feed, my thoughts and the live feed
+        if name == 'thoughtify_fragment_cache_requests_total' and labels['fragment'] == 'thought_card_compact':
+            lookups[labels['result']] += value
+    gauges = []
+    if lookups['hit'] + lookups['miss']:
+        gauges.append(('thoughtify_feed_cache_hit_ratio', 'Share of feed card fragments served from cache',
+                       lookups['hit'] / (lookups['hit'] + lookups['miss'])))
+    gauges.append(('thoughtify_draft_thoughts', 'Rows in the draft table', DraftThought.objects.count()))
+    store = import_module(settings.SESSION_ENGINE).SessionStore
+    if hasattr(store, 'get_model_class'):
+        gauges.append(('thoughtify_sessions', 'Rows in the session table', store.get_model_class().objects.count()))
+    return totals, gauges
+
+def metrics_view(request):
+    """Prometheus metrics summed over every worker on this host"""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    # REMOTE_ADDR is the proxy's address behind one, so there is no localhost exception
+    supplied = request.headers.get('Authorization', '')
+    if not token or not hmac.compare_digest(supplied.encode(), f'Bearer {token}'.encode()):
+        return HttpResponseForbidden()
+    totals, gauges = metrics_gauges()
+    return HttpResponse(metrics.render(totals, gauges), content_type='text/plain; version=0.0.4')